@@ -5,7 +5,7 @@ from threading import Thread
 from dataclasses import dataclass
 
 from SoapySDR import Device, SOAPY_SDR_CF32, SOAPY_SDR_RX
-from radiocore import Buffer, RingBuffer, FM, MFM, WBFM, Tuner
+from radiocore import RingBuffer, FM, MFM, WBFM, Tuner, Dispatcher
 
 
 @dataclass
@@ -14,6 +14,7 @@ class Channel:
     bandwidth: float    # The FM station bandwidth. (240-256 kHz).
     audio_fs: float     # The audio sample-rate.
     demodulator: FM     # The demodulator to use (WBFM, MFM, or FM).
+    squelch: float = None   # Power in dBFS to demodulate, None to always.
 
 
 @dataclass
@@ -46,25 +47,28 @@ class SdrDevice(Thread):
 
         print("Allocating SDR device buffers...")
         self.buffer = RingBuffer(self.config.input_rate * 3,
-                                 cuda=self.config.enable_cuda)
+                                 cuda=self.config.enable_cuda,
+                                 mirrored=not self.config.enable_cuda,
+                                 overflow="block")
 
     @property
     def output(self) -> RingBuffer:
         return self.buffer
 
     def run(self):
-        tmp_buffer = Buffer(2**16, cuda=self.config.enable_cuda)
-
         self.sdr.activateStream(self.rx)
         self.running = True
 
         while self.running:
+            # Read the samples straight into the ring buffer. It waits
+            # for the consumer when full instead of discarding unread
+            # samples ahead of the device.
+            span, _ = self.buffer.reserve(2**16, timeout=0.5)
             c = self.sdr.readStream(self.rx,
-                                    [tmp_buffer.data],
-                                    tmp_buffer.size,
+                                    [span],
+                                    len(span),
                                     timeoutUs=500000)
-            if c.ret > 0:
-                self.buffer.put(tmp_buffer.data[:c.ret])
+            self.buffer.commit(max(c.ret, 0))
 
     def stop(self):
         self.sdr.deactivateStream(self.rx)
@@ -81,25 +85,35 @@ class Dsp(Thread):
         self.config = config
         self.socket = socket
         self.data_in = data_in
+        self.dispatcher = Dispatcher(tuner)
         self.running = False
 
     def run(self):
-        tmp_buffer = Buffer(self.config.input_rate, cuda=self.config.enable_cuda)
+        block_size = int(self.config.input_rate)
 
         self.running = True
 
         while self.running:
             occupancy = (self.data_in.occupancy / self.data_in.capacity) * 100
-            print(f"DSP buffer occupancy: {occupancy:.2f}%")
+            print(f"DSP buffer occupancy: {occupancy:.2f}% "
+                  f"(overflows: {self.data_in.overflow}, "
+                  f"dropped: {self.data_in.dropped})")
 
-            if not self.data_in.get(tmp_buffer.data):
+            # Read the block in place, the Tuner copies it into its FFT.
+            block = self.data_in.read_view(block_size)
+            if block is None:
                 continue
 
-            self.tuner.load(tmp_buffer.data)
+            self.tuner.load(block)
+            self.data_in.release(block_size)
+
+            outputs = self.dispatcher.run()
+
+            for channel, tmp in zip(self.tuner.channels(), outputs):
+                # Channels closed by the squelch aren't demodulated.
+                if tmp is None:
+                    continue
 
-            for channel in self.tuner.channels():
-                tmp = self.tuner.run(channel.index)
-                tmp = channel.demodulator.run(tmp)
                 tmp = tmp.tobytes()
 
                 payload = [channel.address_bytes, tmp]
@@ -108,6 +122,7 @@ class Dsp(Thread):
     def stop(self):
         self.running = False
         self.join()
+        self.dispatcher.shutdown()
 
 
 if __name__ == "__main__":
@@ -128,13 +143,18 @@ if __name__ == "__main__":
                                     channel.audio_fs,
                                     deemphasis=config.deemphasis,
                                     cuda=config.enable_cuda)
+        demod.warmup()
 
         # Commit channel configuration to Tuner.
-        tuner.add_channel(channel.frequency, channel.bandwidth, demod)
+        tuner.add_channel(channel.frequency, channel.bandwidth, demod,
+                          squelch=channel.squelch)
 
     # We request a bandwidth since Airspy doesn't support variable fs.
     tuner.request_bandwidth(config.input_rate)
 
+    # Plan the FFTs before the SDR stream starts.
+    tuner.warmup()
+
     # Configure SDR device thread.
     rx = SdrDevice(config, tuner)
     dsp = Dsp(config, tuner, socket, rx.output)
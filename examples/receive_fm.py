@@ -37,25 +37,27 @@ class SdrDevice(Thread):
 
         print("Allocating SDR device buffers...")
         self.buffer = RingBuffer(self.config.input_rate * 3,
-                                 cuda=self.config.enable_cuda)
+                                 cuda=self.config.enable_cuda,
+                                 overflow="block")
 
     @property
     def output(self) -> RingBuffer:
         return self.buffer
 
     def run(self):
-        tmp_buffer = Buffer(2**16, cuda=self.config.enable_cuda)
-
         self.sdr.activateStream(self.rx)
         self.running = True
 
         while self.running:
+            # Read the samples straight into the ring buffer. It waits
+            # for the consumer when full instead of discarding unread
+            # samples ahead of the device.
+            span, _ = self.buffer.reserve(2**16, timeout=0.5)
             c = self.sdr.readStream(self.rx,
-                                    [tmp_buffer.data],
-                                    tmp_buffer.size,
+                                    [span],
+                                    len(span),
                                     timeoutUs=500000)
-            if c.ret > 0:
-                self.buffer.put(tmp_buffer.data[:c.ret])
+            self.buffer.commit(max(c.ret, 0))
 
     def stop(self):
         self.sdr.deactivateStream(self.rx)
@@ -81,6 +83,10 @@ class Dsp(Thread):
                               self.config.demod_rate,
                               cuda=self.config.enable_cuda)
 
+        print("Planning DSP...")
+        self.demod.warmup()
+        self.decim.warmup()
+
         print("Allocating DSP buffers...")
         self.que = queue.Queue()
 
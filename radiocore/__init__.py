@@ -2,6 +2,9 @@
 
 from radiocore.analog import *
 from radiocore.tools import *
+from radiocore._internal import fft_workers, get_fft_workers, set_fft_workers
+from radiocore._internal import use_fftw, save_fftw_wisdom
+from radiocore._internal import use_autotune, disable_autotune
 
 def HasCuda():
     r"""
@@ -1,6 +1,173 @@
 """Defines a Injector module."""
 
+import os
+import copy
+import json
+import time
+import pickle
+import platform
 import importlib
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Union
+
+_fft_workers: int = 1
+_fftw = None
+_autotune = None
+
+
+def set_fft_workers(workers: int):
+    """
+    Set the number of worker threads of the CPU FFTs.
+
+    The setting is library-wide and applies to every FFT of radiocore,
+    including the ones of resample, hilbert and the FFT convolutions.
+    Batched and multi-dimensional FFTs are split between the workers.
+
+    Parameters
+    ----------
+    workers : int
+        number of worker threads, negative values wrap around the CPU
+        count like scipy.fft (default is 1)
+    """
+    global _fft_workers
+
+    if int(workers) == 0:
+        raise ValueError("workers should be a non-zero integer")
+
+    _fft_workers = int(workers)
+
+    if _fftw is not None:
+        _fftw.config.NUM_THREADS = _threads(_fft_workers)
+
+
+def get_fft_workers() -> int:
+    """Return the number of worker threads of the CPU FFTs."""
+    return _fft_workers
+
+
+def use_fftw(wisdom: Union[str, None] = None,
+             planner_effort: str = "FFTW_MEASURE"):
+    """
+    Use pyFFTW as the backend of the CPU FFTs.
+
+    Every scipy.fft call is dispatched to FFTW, including the ones of
+    resample and hilbert. The FFTW plans are cached in memory by size
+    and dtype, and can be saved to disk as wisdom with save_fftw_wisdom()
+    to skip the planning of the next runs. Measured plans of large sizes
+    can take a while, so warm up the blocks before streaming and save the
+    wisdom afterwards. This option requires pyFFTW.
+
+    Parameters
+    ----------
+    wisdom : str, optional
+        path of a wisdom file to load, ignored if it doesn't exist
+    planner_effort : str
+        FFTW planner effort (default is FFTW_MEASURE)
+    """
+    global _fftw
+
+    _fftw = importlib.import_module('pyfftw')
+    importlib.import_module('pyfftw.interfaces.scipy_fft')
+    _fftw.interfaces.cache.enable()
+    _fftw.config.PLANNER_EFFORT = planner_effort
+    _fftw.config.NUM_THREADS = _threads(_fft_workers)
+
+    if wisdom is not None and os.path.exists(wisdom):
+        with open(wisdom, "rb") as _file:
+            _fftw.import_wisdom(pickle.load(_file))
+
+    _scipy_fft = importlib.import_module('scipy.fft')
+    _scipy_fft.set_global_backend(_fftw.interfaces.scipy_fft)
+
+
+def save_fftw_wisdom(wisdom: str):
+    """
+    Save the FFTW plans of this process as wisdom.
+
+    Parameters
+    ----------
+    wisdom : str
+        path of the wisdom file
+    """
+    if _fftw is None:
+        raise ValueError("FFTW backend isn't in use, see use_fftw()")
+
+    with open(wisdom, "wb") as _file:
+        pickle.dump(_fftw.export_wisdom(), _file)
+
+
+def _threads(workers: int) -> int:
+    # Negative workers wrap around the CPU count like scipy.fft.
+    if workers < 0:
+        return max((os.cpu_count() or 1) + 1 + workers, 1)
+    return workers
+
+
+def use_autotune(cache: Union[str, None] = None, repeat: int = 3):
+    """
+    Pick the fastest implementation of the blocks by benchmark.
+
+    Some blocks have several implementations of the same operation, like
+    the IIR and FIR realizations of Deemphasis or the zoom mode of Tuner.
+    The first time a configuration is seen, every candidate is timed and
+    the fastest is kept. The results are keyed by block, sizes, dtype,
+    backend and CPU model, and saved to the cache file, so the next
+    constructions, also of other runs, skip the benchmark. The choices
+    set explicitly on a block take precedence.
+
+    Parameters
+    ----------
+    cache : str, optional
+        path of a JSON cache file, created if it doesn't exist
+        (default is None, results are kept in memory)
+    repeat : int
+        timed runs of each candidate, the best one counts (default is 3)
+    """
+    global _autotune
+
+    _results = {}
+    if cache is not None and os.path.exists(cache):
+        with open(cache, "r") as _file:
+            _results = json.load(_file)
+
+    _autotune = (cache, max(int(repeat), 1), _results)
+
+
+def disable_autotune():
+    """Stop picking implementations by benchmark, see use_autotune()."""
+    global _autotune
+    _autotune = None
+
+
+def _cpu_model() -> str:
+    # Name of the CPU model. The platform names are used when unknown.
+    try:
+        with open("/proc/cpuinfo", "r") as _file:
+            for _line in _file:
+                if _line.startswith("model name"):
+                    return _line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+
+    return platform.processor() or platform.machine()
+
+
+@contextmanager
+def fft_workers(workers: int):
+    """
+    Set the number of worker threads of the CPU FFTs within a context.
+
+    Parameters
+    ----------
+    workers : int
+        number of worker threads (see set_fft_workers)
+    """
+    _previous = get_fft_workers()
+    set_fft_workers(workers)
+    try:
+        yield
+    finally:
+        set_fft_workers(_previous)
 
 
 class Injector:
@@ -15,6 +182,8 @@ class Injector:
 
     def __init__(self, cuda=False):
         """Initialize the Injector class."""
+        self.__cuda = bool(cuda)
+
         if cuda:
             self._xs = importlib.import_module('cusignal')
             self._xp = importlib.import_module('cupy')
@@ -27,3 +196,243 @@ class Injector:
             self._np = self._xp
             self._ss = self._xs
             self._fft = importlib.import_module('scipy.fft')
+
+    # Attributes holding the state of the stream, rewound by warmup().
+    _stream = ()
+
+    def warmup(self):
+        """
+        Prepare the block in advance of the first run().
+
+        The block processes a dummy block of zeros of its configured size,
+        so the FFT plans, workspace and state buffers are allocated by the
+        block itself. The state of the stream is rewound afterwards, so
+        the output is the same as without the warmup.
+        """
+        _dummy = self._dummy()
+        if _dummy is None:
+            return
+
+        _state = self._save_stream()
+
+        # Zeros might divide by zero, like the PLL of the WBFM.
+        with self._np.errstate(all="ignore"):
+            self.run(_dummy)
+
+        self._load_stream(_state)
+
+    def _dummy(self):
+        # Input block of warmup(). None when there's nothing to prepare.
+        return None
+
+    def _save_stream(self):
+        # Copy of the stream state of the block and its inner blocks.
+        _state = {_name: copy.deepcopy(self.__dict__[_name])
+                  for _name in self._stream if _name in self.__dict__}
+
+        for _name, _block in self.__dict__.items():
+            if isinstance(_block, Injector):
+                _state[_name] = _block._save_stream()
+
+        return _state
+
+    def _load_stream(self, state):
+        # Rewind the stream state saved by _save_stream().
+        for _name, _value in state.items():
+            _current = getattr(self, _name)
+            if isinstance(_current, Injector):
+                _current._load_stream(_value)
+            else:
+                setattr(self, _name, self.__rewind(_current, _value))
+
+    def __rewind(self, current, previous):
+        # Previous value of the state, copied into the current buffers when
+        # they fit, so the buffers allocated meanwhile are kept. State
+        # created meanwhile restarts from zeros.
+        if previous is None:
+            return self.__zeros(current)
+
+        if isinstance(previous, (list, tuple)) and \
+                type(current) is type(previous) and \
+                len(current) == len(previous):
+            _items = [self.__rewind(_c, _p)
+                      for _c, _p in zip(current, previous)]
+            if isinstance(current, tuple):
+                return tuple(_items)
+            current[:] = _items
+            return current
+
+        if not isinstance(current, self._xp.ndarray) or \
+                getattr(previous, "dtype", None) != current.dtype:
+            return previous
+
+        try:
+            _shape = self._np.broadcast_shapes(current.shape, previous.shape)
+        except ValueError:
+            return previous
+
+        if _shape != current.shape:
+            return previous
+
+        current[...] = self._xp.asarray(previous)
+        return current
+
+    def __zeros(self, current):
+        # Initial value of a state created by the warmup.
+        if isinstance(current, self._xp.ndarray):
+            current[...] = 0
+            return current
+
+        if isinstance(current, list):
+            current[:] = [self.__zeros(_item) for _item in current]
+            return current
+
+        if isinstance(current, tuple):
+            return tuple(self.__zeros(_item) for _item in current)
+
+        if isinstance(current, (int, float, complex)):
+            return type(current)(0)
+
+        return None
+
+    def _scratch(self, name: str, shape, dtype):
+        # Workspace buffer of the block reused by every run(). It's only
+        # reallocated when the shape or dtype changes.
+        _workspace = self.__dict__.setdefault("_workspace", {})
+        _buffer = _workspace.get(name)
+
+        if _buffer is None or _buffer.shape != tuple(shape) or \
+                _buffer.dtype != self._np.dtype(dtype):
+            _buffer = self._xp.empty(shape, dtype=dtype)
+            _workspace[name] = _buffer
+
+        return _buffer
+
+    def _output(self, out, shape, dtype):
+        # Buffer the result is written into, the caller's out buffer or a
+        # new array without one.
+        if out is None:
+            return self._xp.empty(shape, dtype=dtype)
+
+        if out.shape != tuple(shape):
+            raise ValueError("out shape and output shape mismatch")
+
+        return out
+
+    def _host(self, result, out=None):
+        # Copy the result from the GPU to the CPU, into out if given.
+        if out is None:
+            return self._xp.asnumpy(result)
+
+        if out.shape != result.shape:
+            raise ValueError("out shape and output shape mismatch")
+
+        return result.get(out=out)
+
+    def _into(self, out, result):
+        # Copy a result allocated by a routine without an out argument,
+        # like lfilter(), into the caller's out buffer, if any.
+        if out is None:
+            return result
+
+        if out.shape != result.shape:
+            raise ValueError("out shape and output shape mismatch")
+
+        out[...] = result
+        return out
+
+    def _autotune(self, sizes, candidates: Dict[str, Callable]):
+        # Name of the fastest candidate for the configuration, None when
+        # autotuning is disabled. Each candidate is a factory of a call
+        # that runs the operation once, warmed up before being timed.
+        if _autotune is None:
+            return None
+
+        _cache, _repeat, _results = _autotune
+        _backend = "cuda" if self.__cuda else (
+            f"{'fftw' if _fftw is not None else 'scipy'}:{_fft_workers}")
+        _key = f"{type(self).__name__}|{tuple(sizes)}|{_backend}|" \
+            f"{_cpu_model()}"
+
+        if _results.get(_key) in candidates:
+            return _results[_key]
+
+        _times = {}
+        for _name, _factory in candidates.items():
+            _call = _factory()
+            _call()
+            _times[_name] = float("inf")
+            for _ in range(_repeat):
+                _start = time.perf_counter()
+                _call()
+                if self.__cuda:
+                    self._xp.cuda.Stream.null.synchronize()
+                _times[_name] = min(_times[_name],
+                                    time.perf_counter() - _start)
+
+        _results[_key] = min(_times, key=_times.get)
+
+        if _cache is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(_cache)),
+                        exist_ok=True)
+            with open(_cache, "w") as _file:
+                json.dump(_results, _file, indent=1, sort_keys=True)
+
+        return _results[_key]
+
+    def _fft_workers(self):
+        # Context that applies the FFT workers setting to the scipy.fft
+        # calls of the current thread. The GPU FFTs ignore it.
+        if self.__cuda:
+            return nullcontext()
+        return self._fft.set_workers(get_fft_workers())
+
+    def _polyphase_taps(self, taps, factor: int, dtype):
+        # Taps of a decimation by factor arranged as (block position x
+        # block lag) after a delay of one block minus one sample, see
+        # _polyphase_filter().
+        _blocks = -(-(len(taps) + factor - 1) // factor)
+        _matrix = self._np.zeros(_blocks * factor, dtype=dtype)
+        _matrix[factor - 1:factor - 1 + len(taps)] = taps
+        _matrix = _matrix.reshape(_blocks, factor)[:, ::-1].T
+
+        return self._xp.asarray(_matrix, dtype=dtype)
+
+    def _polyphase_filter(self, input_sig, taps, size: int, out=None):
+        # Polyphase decimation as a matrix product of the input arranged
+        # in blocks with the taps of _polyphase_taps(). Each column of the
+        # product is the contribution of one block of taps. The input
+        # starts with the filter history of one block per lag, and size
+        # samples are output along the last axis.
+        _factor, _lag = taps.shape[0], taps.shape[1] - 1
+        _prod = self._xp.matmul(
+            input_sig.reshape(input_sig.shape[:-1] + (-1, _factor)), taps)
+
+        if out is None:
+            out = _prod[..., _lag:_lag + size, 0].copy()
+        else:
+            out[...] = _prod[..., _lag:_lag + size, 0]
+
+        for _l in range(1, _lag + 1):
+            out += _prod[..., _lag - _l:_lag - _l + size, _l]
+
+        return out
+
+    def _overwrite(self):
+        # Keyword arguments of the FFTs that let them reuse the input
+        # buffer. The GPU FFTs of cupy.fft don't take them.
+        if self.__cuda:
+            return {}
+        return {"overwrite_x": True}
+
+    def __getstate__(self):
+        """Return the state without the injected modules for pickling."""
+        _state = self.__dict__.copy()
+        for _name in ("_xs", "_xp", "_np", "_ss", "_fft"):
+            _state.pop(_name, None)
+        return _state
+
+    def __setstate__(self, state):
+        """Restore the state and inject the modules again."""
+        self.__dict__.update(state)
+        Injector.__init__(self, self.__cuda)
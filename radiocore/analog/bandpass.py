@@ -8,6 +8,11 @@ class Bandpass(Injector):
     """
     The Bandpass class provides a zero-phase bandpass filter..
 
+    With streaming enabled, the filter is causal instead. Each sample is
+    filtered once and the filter state is carried between blocks of any
+    size, so there are no edge transients. The output is delayed by the
+    group delay of the filter, see the delay property.
+
     Parameters
     ----------
     input_size : int, float
@@ -24,8 +29,12 @@ class Bandpass(Injector):
         window filter function (default is hamm)
     cuda : bool
         use the GPU for processing (default is False)
+    streaming : bool
+        use the causal filter with state (default is False)
     """
 
+    _stream = ("_state",)
+
     def __init__(self,
                  input_size: Union[int, float],
                  start_freq: Union[int, float],
@@ -33,9 +42,11 @@ class Bandpass(Injector):
                  dtype: str = "float32",
                  num_taps: int = 61,
                  window: str = "hamm",
-                 cuda: bool = False):
+                 cuda: bool = False,
+                 streaming: bool = False):
         """Initialize the Bandpass class."""
         self._cuda: bool = cuda
+        self._streaming: bool = streaming
         self._dtype: str = dtype
         self._window: str = window
         self._num_taps: int = int(num_taps)
@@ -52,23 +63,41 @@ class Bandpass(Injector):
         _a = [1.0]
         self._taps = (self._xp.array(_b, dtype=self._dtype),
                       self._xp.array(_a, dtype=self._dtype))
+        self._state = self._xp.zeros(self._num_taps - 1, dtype=self._dtype)
+
+    @property
+    def delay(self) -> int:
+        """Return the output delay in samples. Zero without streaming."""
+        return (self._num_taps - 1) // 2 if self._streaming else 0
 
     def __nyq(self, freq_hz):
         return (freq_hz / (0.5 * self._input_size))
 
-    def run(self, input_sig):
+    def run(self, input_sig, out=None):
         """
         Filter the input signal and output the result.
 
         Parameters
         ----------
         input_sig : arr
-            input signal array, size should match the input_size
+            input signal array, size should match the input_size unless
+            streaming is enabled
+        out : arr, optional
+            output buffer with the size of the input
         """
+        _tmp = self._xp.asarray(input_sig)
+
+        if self._streaming:
+            _tmp, self._state = self._xs.lfilter(*self._taps, _tmp,
+                                                 zi=self._state)
+            return self._into(out, _tmp)
+
         if len(input_sig) != self._input_size:
             raise ValueError("input_sig size and input_size mismatch")
 
-        _tmp = self._xp.asarray(input_sig)
         _tmp = self._xs.filtfilt(*self._taps, _tmp)
 
-        return _tmp
+        return self._into(out, _tmp)
+
+    def _dummy(self):
+        return self._xp.zeros(self._input_size, dtype=self._dtype)
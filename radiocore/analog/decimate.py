@@ -1,5 +1,6 @@
 """Defines a signal decimator."""
 
+from fractions import Fraction
 from typing import Union
 from radiocore._internal import Injector
 
@@ -8,6 +9,14 @@ class Decimate(Injector):
     """
     The Decimate class provides FIR decimation.
 
+    By default, each block is resampled in the frequency domain. With
+    streaming enabled, a cascade of polyphase FIR stages is used instead.
+    The cascade is planned to minimize the multiplications per input
+    sample, e.g. a 40x reduction runs as 10x2x2. The filter states are
+    carried between blocks, so blocks can have any size, and each call
+    outputs every sample that the input allows. The cost is proportional
+    to the output samples times the taps of each stage.
+
     Parameters
     ----------
     input_size : int, float
@@ -16,35 +25,194 @@ class Decimate(Injector):
         output signal buffer size
     cuda : bool
         use the GPU for processing (default is False)
+    streaming : bool
+        use the polyphase FIR cascade with state (default is False)
+    transition : float
+        transition width of the streaming filters as fraction of the
+        output Nyquist frequency (default is 0.2)
+    attenuation : float
+        stopband attenuation of the streaming filters in dB
+        (default is 60)
     """
 
+    _stream = ("_stages",)
+
     def __init__(self,
                  input_size: Union[int, float],
                  output_size: Union[int, float],
-                 cuda: bool = False):
+                 cuda: bool = False,
+                 streaming: bool = False,
+                 transition: float = 0.2,
+                 attenuation: float = 60.0):
         """Initialize the Decimate class."""
         self._cuda: bool = cuda
+        self._streaming: bool = streaming
+        self._transition: float = float(transition)
+        self._attenuation: float = float(attenuation)
         self._input_size: int = int(input_size)
         self._output_size: int = int(output_size)
 
         super().__init__(cuda)
 
+        if self._streaming:
+            self.__plan()
+            return
+
         self._win = self._xs.get_window("hamm", self._input_size)
         self._win = self._fft.fftshift(self._win)
 
-    def run(self, input_sig):
+    @property
+    def num_stages(self) -> int:
+        """Return the number of filter stages. Zero without streaming."""
+        return len(self._stages) if self._streaming else 0
+
+    def run(self, input_sig, out=None):
         """
         Decimate the input signal and output the result.
 
         Parameters
         ----------
         input_sig : arr
-            input signal array, size should match the input_size
+            input signal array, the last axis is decimated, its size
+            should match the input_size unless streaming is enabled
+        out : arr, optional
+            output buffer with output_size samples in the last axis
         """
-        if len(input_sig) != self._input_size:
+        _tmp = self._xp.asarray(input_sig)
+
+        if self._streaming:
+            if not self._stages:
+                return self._into(out, _tmp)
+            _last = len(self._stages) - 1
+            for _index in range(len(self._stages)):
+                _tmp = self.__filter(_index, _tmp,
+                                     out if _index == _last else None)
+            return _tmp
+
+        if _tmp.shape[-1] != self._input_size:
             raise ValueError("input_sig size and input_size mismatch")
 
-        _tmp = self._xp.asarray(input_sig)
-        _tmp = self._xs.resample(_tmp, self._output_size, window=self._win)
+        with self._fft_workers():
+            _tmp = self._xs.resample(_tmp, self._output_size,
+                                     window=self._win, axis=-1)
+
+        return self._into(out, _tmp)
+
+    def _dummy(self):
+        return self._xp.zeros(self._input_size, dtype="float32")
+
+    def __filter(self, index: int, input_sig, out=None):
+        _taps, _up, _down, _hist, _state = self._stages[index]
+        _buffer, _fill = _state
+
+        # The buffer holds the history of the filter followed by the input
+        # samples left over from the last block, the input is appended.
+        if _buffer is None or _buffer.dtype != input_sig.dtype or \
+                _buffer.shape[:-1] != input_sig.shape[:-1]:
+            _buffer, _fill = None, _hist
+
+        _size = _fill + input_sig.shape[-1]
+        if _buffer is None or _buffer.shape[-1] < _size:
+            _grown = self._xp.zeros(input_sig.shape[:-1] + (_size + _down,),
+                                    dtype=input_sig.dtype)
+            if _buffer is not None:
+                _grown[..., :_fill] = _buffer[..., :_fill]
+            _buffer = _state[0] = _grown
+
+        _buffer[..., _fill:_size] = input_sig
+        _used = ((_size - _hist) // _down) * _down
+        _tmp = _buffer[..., :_hist + _used]
+
+        # Inner stages output into the workspace, the last one into out.
+        _shape = input_sig.shape[:-1] + ((_used * _up) // _down,)
+        if index < len(self._stages) - 1:
+            out = self._scratch(f"stage{index}", _shape, input_sig.dtype)
+        elif out is not None and out.shape != _shape:
+            raise ValueError("out shape and output shape mismatch")
+
+        if _up != 1:
+            # Rational resampling. The history is a multiple of the down
+            # factor, so the output grid stays aligned between blocks.
+            _tmp = self._xs.upfirdn(_taps, _tmp, up=_up, down=_down, axis=-1)
+            _start = (_hist * _up) // _down
+            _tmp = self._into(out, _tmp[..., _start:_start + _shape[-1]])
+        else:
+            # Integer decimation as a matrix product.
+            _tmp = self._polyphase_filter(_tmp, _taps, _shape[-1], out)
+
+        # Move the history and the samples left over to the front.
+        _keep = _size - _used
+        _state[1] = _keep
+        for _row in _buffer.reshape(-1, _buffer.shape[-1]):
+            _left = _row[_used:_size]
+            _row[:_keep] = _left if _used >= _keep else _left.copy()
 
         return _tmp
+
+    def __plan(self):
+        _ratio = Fraction(self._output_size, self._input_size)
+        _up, _down = _ratio.numerator, _ratio.denominator
+
+        # Passband edge of every stage. Aliases may land in the transition
+        # band of the output, but never inside the passband.
+        _base = min(self._input_size, self._output_size)
+        _edge = (1 - self._transition) * _base / 2
+
+        # Integer decimation down to the output rate or just above it.
+        _pre = max([_d for _d in range(1, _down + 1)
+                    if (_down % _d) == 0 and (_down // _d) >= _up],
+                   default=1)
+        _rate = float(self._input_size)
+
+        self._stages = []
+        for _factor in self.__cascade(_rate, _pre, _edge):
+            _taps = self.__lowpass(_rate, _factor, _edge)
+
+            _matrix = self._polyphase_taps(_taps, _factor, "float32")
+            self._stages.append((_matrix, 1, _factor,
+                                 (_matrix.shape[1] - 1) * _factor,
+                                 [None, (_matrix.shape[1] - 1) * _factor]))
+            _rate /= _factor
+
+        _down //= _pre
+        if _up == 1 and _down == 1:
+            return
+
+        # Rational stage at the upsampled rate. Cutoff at the Nyquist
+        # frequency of the lowest rate with the transition centered on it.
+        _fu = _rate * _up
+        _width = (self._transition * _base) / (_fu / 2)
+        _num, _beta = self._ss.kaiserord(self._attenuation, _width)
+        _taps = self._ss.firwin(_num, _base / _fu, window=("kaiser", _beta))
+        _taps = self._xp.asarray(_taps * _up, dtype="float32")
+
+        _hist = -(-(_num - 1) // (_up * _down)) * _down
+        self._stages.append((_taps, _up, _down, _hist, [None, _hist]))
+
+    def __cascade(self, rate: float, factor: int, edge: float):
+        # Cheapest ordered factorization of the decimation factor. The
+        # cost of a stage is its input rate times the taps per output.
+        _best = {1: (0.0, [])}
+
+        for _left in sorted([_d for _d in range(2, factor + 1)
+                             if (factor % _d) == 0]):
+            _in = rate / (factor // _left)
+            _options = []
+            for _m in range(2, _left + 1):
+                if (_left % _m) != 0:
+                    continue
+                _cost, _tail = _best[_left // _m]
+                _num = len(self.__lowpass(_in, _m, edge))
+                _options.append((_cost + (_in * _num / _m), [_m] + _tail))
+            _best[_left] = min(_options)
+
+        return _best[factor][1]
+
+    def __lowpass(self, rate: float, factor: int, edge: float):
+        # Passband up to the edge and stopband from the first alias of
+        # the edge at the output rate.
+        _stop = (rate / factor) - edge
+        _width = (_stop - edge) / (rate / 2)
+        _num, _beta = self._ss.kaiserord(self._attenuation, _width)
+        _cutoff = (edge + _stop) / rate
+        return self._ss.firwin(_num, _cutoff, window=("kaiser", _beta))
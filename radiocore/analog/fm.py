@@ -21,29 +21,43 @@ class FM(Injector):
         not used in fm mode
     cuda : bool
         use the GPU for processing (default is False)
+    streaming : bool
+        use the conjugate-product discriminator and the polyphase
+        decimator, which carry their state between blocks, so the output
+        is continuous across block boundaries (default is False)
     """
 
+    _stream = ("_last",)
+
     def __init__(self,
                  input_size: Union[int, float],
                  output_size: Union[int, float],
                  deemphasis: float = 75e-6,
-                 cuda: bool = False):
+                 cuda: bool = False,
+                 streaming: bool = False):
         """Initialize the FM class."""
         self._cuda: bool = cuda
+        self._streaming: bool = streaming
         self._input_size: int = int(input_size)
         self._output_size: int = int(output_size)
+        self._last = 0.0
 
         self._decimate = Decimate(self._input_size, self._output_size,
+                                  streaming=self._streaming,
                                   cuda=self._cuda)
 
         super().__init__(cuda)
 
+        if self._streaming:
+            self._scratch("product", (self._input_size,), "complex64")
+            self._scratch("phase", (self._input_size,), "float32")
+
     @property
     def channels(self):
         """Return the number of audio channels of the output."""
         return 1
 
-    def run(self, input_sig, numpy_output: bool = True):
+    def run(self, input_sig, numpy_output: bool = True, out=None):
         """
         Demodulate the input signal and output the audio buffer.
 
@@ -53,20 +67,54 @@ class FM(Injector):
             input signal array, size should match the input_size
         numpy_output: bool
             copy buffer to the cpu if cuda is enabled (default True)
+        out : arr, optional
+            output buffer with shape (output_size, 1)
         """
         if len(input_sig) != self._input_size:
             raise ValueError("input_sig size and input_size mismatch")
 
         _tmp = self._xp.asarray(input_sig)
-        _tmp = self._xp.angle(_tmp)
-        _tmp = self._xp.unwrap(_tmp)
-        _tmp = self._xp.diff(_tmp)
-        _tmp = self._xp.pad(_tmp, (1, 0))
-        _tmp = _tmp / self._xp.pi
-        _tmp = self._decimate.run(_tmp)
-        _tmp = self._xp.expand_dims(_tmp, axis=1)
+
+        if self._streaming:
+            _tmp = self.__discriminate(_tmp)
+        else:
+            _tmp = self._xp.angle(_tmp)
+            _tmp = self._xp.unwrap(_tmp)
+            _tmp = self._xp.diff(_tmp)
+            _tmp = self._xp.pad(_tmp, (1, 0))
+            _tmp = _tmp / self._xp.pi
 
         if self._cuda and numpy_output:
-            return self._xp.asnumpy(_tmp)
+            _tmp = self._decimate.run(_tmp)
+            return self._host(self._xp.expand_dims(_tmp, axis=1), out)
+
+        if out is None:
+            return self._xp.expand_dims(self._decimate.run(_tmp), axis=1)
+
+        if out.shape[1:] != (1,):
+            raise ValueError("out shape and output shape mismatch")
+
+        self._decimate.run(_tmp, out=out[:, 0])
+        return out
+
+    def _dummy(self):
+        return self._xp.zeros(self._input_size, dtype="complex64")
+
+    def __discriminate(self, input_sig):
+        _dtype = self._xp.result_type(input_sig, "complex64")
+        _prod = self._scratch("product", (self._input_size,), _dtype)
+        _phase = self._scratch("phase", (self._input_size,),
+                               _prod.real.dtype)
+
+        # Phase difference of consecutive samples as the angle of x[n]
+        # times conj(x[n-1]). The first sample pairs with the last sample
+        # of the previous block.
+        self._xp.conjugate(input_sig[:-1], out=_prod[1:])
+        _prod[0] = self._xp.conj(self._last)
+        _prod *= input_sig
+        self._last = input_sig[-1].copy()
+
+        self._xp.arctan2(_prod.imag, _prod.real, out=_phase)
+        _phase /= self._xp.pi
 
-        return _tmp
+        return _phase
@@ -24,31 +24,38 @@ class MFM(Injector):
         otherwise 50e-6 (default is 75e-6)
     cuda : bool
         use the GPU for processing (default is False)
+    streaming : bool
+        carry the FM and filter states between blocks (default is False)
     """
 
     def __init__(self,
                  input_size: Union[int, float],
                  output_size: Union[int, float],
                  deemphasis: float = 75e-6,
-                 cuda: bool = False):
+                 cuda: bool = False,
+                 streaming: bool = False):
         """Initialize the Mono-FM class."""
         self._cuda: bool = cuda
         self._input_size: int = int(input_size)
         self._output_size: int = int(output_size)
 
         self._fm_demod = FM(self._input_size, self._output_size,
-                            cuda=self._cuda)
+                            streaming=streaming, cuda=self._cuda)
         self._deemphasis = Deemphasis(self._output_size, deemphasis,
                                       cuda=self._cuda)
 
         super().__init__(cuda)
 
+        self._scratch("fm", (self._output_size, 1), "float32")
+        if self._cuda:
+            self._scratch("audio", (self._output_size, 1), "float32")
+
     @property
     def channels(self):
         """Return the number of audio channels of the output."""
         return 1
 
-    def run(self, input_sig, numpy_output: bool = True):
+    def run(self, input_sig, numpy_output: bool = True, out=None):
         """
         Demodulate the input signal and output the audio buffer.
 
@@ -58,14 +65,27 @@ class MFM(Injector):
             input signal array, size should match the input_size
         numpy_output: bool
             copy buffer to the cpu if cuda is enabled (default True)
+        out : arr, optional
+            output buffer with shape (output_size, 1)
         """
-        _tmp = self._fm_demod.run(input_sig, False)[:, 0]
-        _tmp = self._deemphasis.run(_tmp)
-        _tmp -= self._xp.mean(_tmp)
-        _tmp = self._xp.clip(_tmp, -0.999, 0.999)
-        _tmp = self._xp.expand_dims(_tmp, axis=1)
+        _shape = (self._output_size, 1)
+        _tmp = self._fm_demod.run(input_sig, False,
+                                  out=self._scratch("fm", _shape, "float32"))
 
         if self._cuda and numpy_output:
-            return self._xp.asnumpy(_tmp)
+            _audio = self._scratch("audio", _shape, "float32")
+        else:
+            _audio = self._output(out, _shape, "float32")
+
+        _rows = _audio[:, 0]
+        self._deemphasis.run(_tmp[:, 0], out=_rows)
+        _rows -= self._xp.mean(_rows)
+        self._xp.clip(_rows, -0.999, 0.999, out=_rows)
+
+        if self._cuda and numpy_output:
+            return self._host(_audio, out)
+
+        return _audio
 
-        return _tmp
+    def _dummy(self):
+        return self._xp.zeros(self._input_size, dtype="complex64")
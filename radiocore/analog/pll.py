@@ -1,5 +1,6 @@
 """Defines a PLL module."""
 
+from typing import Union
 from radiocore._internal import Injector
 
 
@@ -10,18 +11,60 @@ class PLL(Injector):
     This is usefull to change the frequency of a pilot signal.
     This class is based in the Hilbert transform.
 
+    With streaming enabled, a phase-locked loop tracks the input instead.
+    The phase of a local oscillator is compared to the input once every
+    millisecond and corrected by a proportional-integral loop filter.
+    The oscillator phase and loop filter state are carried between
+    blocks, so the output is continuous. The harmonics are synthesized
+    from the multiplied oscillator phase.
+
     Parameters
     ----------
     cuda : bool, optional
         use the GPU for processing (default is False)
+    frequency : int, float, optional
+        nominal frequency of the input in Hz, required with streaming
+    sample_rate : int, float, optional
+        sample rate of the input in Hz, required with streaming
+    bandwidth : float
+        noise bandwidth of the loop in Hz (default is 20)
+    streaming : bool
+        use the phase-locked loop with state (default is False)
     """
 
-    def __init__(self, cuda: bool = False):
+    _stream = ("_phase", "_integral")
+
+    def __init__(self,
+                 cuda: bool = False,
+                 frequency: Union[int, float, None] = None,
+                 sample_rate: Union[int, float, None] = None,
+                 bandwidth: float = 20.0,
+                 streaming: bool = False):
         """Initialize the PLL class."""
         self._cuda: bool = cuda
+        self._streaming: bool = streaming
         self._baseline = None
         super().__init__(self._cuda)
 
+        if not self._streaming:
+            return
+
+        if frequency is None or sample_rate is None:
+            raise ValueError("frequency and sample_rate are required with "
+                             "streaming")
+
+        # Loop updates per millisecond. Second order loop with a damping
+        # factor of 0.707 and the gains of the update period.
+        self._update: int = max(int(sample_rate // 1e3), 1)
+        self._omega: float = 2 * self._np.pi * frequency / sample_rate
+        _zeta = 1 / self._np.sqrt(2)
+        _wn = 2 * bandwidth / (_zeta + (1 / (4 * _zeta)))
+        _wt = _wn * self._update / sample_rate
+        self._gains = (2 * _zeta * _wt, _wt ** 2)
+
+        self._phase: float = 0.0
+        self._integral: float = 0.0
+
     def step(self, input_sig):
         """
         Update the internal state according to the input_sig (arr).
@@ -31,7 +74,12 @@ class PLL(Injector):
         input_sig : arr
             input signal array
         """
-        self._baseline = self._xs.hilbert(input_sig)
+        if self._streaming:
+            self._baseline = self.__track(self._xp.asarray(input_sig))
+            return
+
+        with self._fft_workers():
+            self._baseline = self._xs.hilbert(input_sig)
 
     def real(self, mult: float = 1.0):
         """
@@ -42,6 +90,9 @@ class PLL(Injector):
         mult : int, float
             frequency multiplier of the output signal
         """
+        if self._streaming:
+            return self._xp.cos(self.__phase(mult))
+
         _tmp = self._baseline ** mult
         return self._xp.real(_tmp) / self._xp.abs(_tmp)
 
@@ -54,5 +105,68 @@ class PLL(Injector):
         mult : int, float
             frequency multiplier of the output signal
         """
+        if self._streaming:
+            return self._xp.sin(self.__phase(mult))
+
         _tmp = self._baseline ** mult
         return self._xp.imag(_tmp) / self._xp.abs(_tmp)
+
+    def __phase(self, mult: float):
+        # Oscillator phase multiplied by mult. The phase of each update
+        # period is wrapped, so the samples fit in single precision.
+        _phase, _slope, _size = self._baseline
+        _phase = self._xp.asarray((_phase * mult) % (2 * self._np.pi),
+                                  dtype="float32")
+        _slope = self._xp.asarray(_slope * mult, dtype="float32")
+        _lag = self._xp.arange(self._update, dtype="float32")
+
+        _tmp = _phase[:, None] + (_slope[:, None] * _lag)
+        return _tmp.reshape(-1)[:_size]
+
+    def __track(self, input_sig):
+        # The input is arranged in update periods. The open loop phasor of
+        # the oscillator is split into a phasor per period and a phasor
+        # along the period, so the mix down is a matrix-vector product.
+        _size = len(input_sig)
+        _count = -(-_size // self._update)
+        _step = self._omega + (self._integral / self._update)
+        _lag = self._xp.arange(self._update)
+
+        _tmp = input_sig
+        if _size != _count * self._update:
+            _tmp = self._xp.zeros(_count * self._update, dtype=_tmp.dtype)
+            _tmp[:_size] = input_sig
+
+        _tmp = _tmp.reshape(_count, self._update)
+        _cos = self._xp.cos(_step * _lag).astype(_tmp.dtype)
+        _sin = self._xp.sin(_step * _lag).astype(_tmp.dtype)
+        _sums = self._xp.matmul(_tmp, _cos) - \
+            (1j * self._xp.matmul(_tmp, _sin))
+        _sums = self._xp.asnumpy(_sums) if self._cuda else _sums
+        _open = self._phase + (_step * self._update *
+                               self._np.arange(_count + 1))
+        _angles = self._np.angle(_sums) - _open[:-1]
+
+        # Proportional-integral loop filter at the update rate. The error
+        # is taken at the middle of each period.
+        _kp, _ki = self._gains
+        _integral = 0.0
+        _corrections = self._np.zeros(_count + 1)
+        for _k, _angle in enumerate(_angles):
+            _error = _angle - (_corrections[_k] + (_integral / 2))
+            _error = ((_error + self._np.pi) % (2 * self._np.pi)) - self._np.pi
+            _integral += _ki * _error
+            _corrections[_k + 1] = _corrections[_k] + (_kp * _error) + \
+                _integral
+
+        # Phase at the start of each period and slope along the period,
+        # the corrections are interpolated between the updates. The last
+        # period may be partial, the next block starts along its slope.
+        _phase = _open + _corrections
+        _slope = _step + (self._np.diff(_corrections) / self._update)
+
+        self._integral += _integral
+        self._phase = float((_phase[-2] + (_slope[-1] * (
+            _size - ((_count - 1) * self._update)))) % (2 * self._np.pi))
+
+        return _phase[:-1], _slope, _size
@@ -16,6 +16,14 @@ class WBFM(Injector):
     For mono FM-stations, use the MFM class.
     For simple FM demodulation, use the FM class.
 
+    With a pilot threshold, the 19 kHz pilot is measured in every block.
+    Without a pilot, the stereo decoding is skipped and the mono audio is
+    output on both channels, so mono stations cost about as much as with
+    the MFM class.
+    The pilot has to rise above the threshold to switch to stereo and
+    fall 3 dB below it to switch back to mono. The decimation and
+    deemphasis states restart when the mode changes.
+
     Parameters
     ----------
     input_size : int, float
@@ -27,43 +35,95 @@ class WBFM(Injector):
         otherwise 50e-6 (default is 75e-6)
     cuda : bool
         use the GPU for processing (default is False)
+    streaming : bool
+        carry the FM, filter and PLL states between blocks
+        (default is False)
+    layout : str
+        stereo layout of the output, interleaved with shape
+        (1, output_size, 2) or planar with shape (2, output_size)
+        (default is interleaved)
+    pilot_threshold : float, None
+        pilot power relative to the composite signal, in dB, that enables
+        the stereo decoding, e.g. -22, None to always decode stereo
+        (default is None)
     """
 
+    _stream = ("_composite", "_stereo")
+
     def __init__(self,
                  input_size: Union[int, float],
                  output_size: Union[int, float],
                  deemphasis: float = 75e-6,
-                 cuda: bool = False):
+                 cuda: bool = False,
+                 streaming: bool = False,
+                 layout: str = "interleaved",
+                 pilot_threshold: Union[float, None] = None):
         """Initialize the Stereo-FM class."""
         self._cuda: bool = cuda
+        self._layout: str = layout
+        self._pilot_threshold = pilot_threshold
+        self._stereo: bool = pilot_threshold is None
         self._input_size: int = int(input_size)
         self._output_size: int = int(output_size)
 
+        if self._layout == "interleaved":
+            self._shape = (1, self._output_size, 2)
+        elif self._layout == "planar":
+            self._shape = (2, self._output_size)
+        else:
+            raise ValueError(f"invalid layout ({layout})")
+
         self._fm_demod = FM(self._input_size, self._input_size,
-                            cuda=self._cuda)
+                            streaming=streaming, cuda=self._cuda)
 
         self._plt_filter = Bandpass(self._input_size, 19e3-50, 19e3+50,
-                                    cuda=self._cuda, num_taps=41)
+                                    cuda=self._cuda, num_taps=41,
+                                    streaming=streaming)
 
-        self._pll = PLL(cuda=self._cuda)
+        self._pll = PLL(cuda=self._cuda, frequency=19e3,
+                        sample_rate=self._input_size, streaming=streaming)
 
+        # Left and right are decimated and deemphasized as the two rows
+        # of one array, so both share a single call per block.
         self._decimate = Decimate(self._input_size, self._output_size,
-                                  cuda=self._cuda)
-
-        self._left_deemphasis = Deemphasis(self._output_size, deemphasis,
-                                           cuda=self._cuda)
+                                  streaming=streaming, cuda=self._cuda)
 
-        self._right_deemphasis = Deemphasis(self._output_size, deemphasis,
-                                            cuda=self._cuda)
+        self._deemphasis = Deemphasis(self._output_size, deemphasis,
+                                      cuda=self._cuda)
 
         super().__init__(cuda)
 
+        # Delay line of the composite, it starts with the samples held
+        # back by the delay of the pilot filter.
+        self._composite = self._xp.zeros(
+            self._plt_filter.delay + self._input_size, dtype="float32")
+
+        # Pilot bin correlated along periods of 20 ms, the bin is wide
+        # enough for the pilot frequency tolerance.
+        _period = max(self._input_size // 50, 1)
+        _phase = 2 * self._np.pi * 19e3 * self._np.arange(_period)
+        _phase /= self._input_size
+        self._pilot = self._xp.asarray(
+            self._np.stack((self._np.cos(_phase), self._np.sin(_phase)), 1),
+            dtype="float32")
+
+        self._scratch("lmr", (self._input_size,), "float32")
+        self._scratch("mix", (2, self._input_size), "float32")
+        self._scratch("dec", (2, self._output_size), "float32")
+        if self._cuda:
+            self._scratch("lr", self._shape, "float32")
+
     @property
     def channels(self):
         """Return the number of audio channels of the output."""
         return 2
 
-    def run(self, input_sig, numpy_output: bool = True):
+    @property
+    def stereo(self) -> bool:
+        """Return True if the last block was decoded as stereo."""
+        return self._stereo
+
+    def run(self, input_sig, numpy_output: bool = True, out=None):
         """
         Demodulate the input signal and output the audio buffer.
 
@@ -73,33 +133,82 @@ class WBFM(Injector):
             input signal array, size should match the input_size
         numpy_output: bool
             copy buffer to the cpu if cuda is enabled (default True)
+        out : arr, optional
+            output buffer with the shape of the layout
         """
         _tmp = self._fm_demod.run(input_sig, False)[:, 0]
 
-        # Filter pilot and update PLL.
-        self._pll.step(self._plt_filter.run(_tmp))
-
-        # Filter the Left - Right component.
-        _lmr = (self._pll.image(2) * _tmp) * 1.0175
-
-        # Mix L+R and L-R to generate L and R
-        _l = self._decimate.run(_tmp + _lmr)
-        _r = self._decimate.run(_tmp - _lmr)
+        if self._pilot_threshold is not None:
+            self._stereo = self.__detect(_tmp)
 
-        # Deemphasize channels.
-        _l = self._left_deemphasis.run(_l)
-        _r = self._right_deemphasis.run(_r)
+        # Filter pilot and update PLL.
+        if self._stereo:
+            self._pll.step(self._plt_filter.run(_tmp))
+
+        # Delay the composite like the pilot, so the subcarrier is aligned.
+        _delay = self._plt_filter.delay
+        if _delay:
+            self._composite[_delay:] = _tmp
+            _tmp = self._composite[:self._input_size]
+
+        _mix = self._scratch("mix", (2,) + _tmp.shape, _tmp.dtype)
+
+        if self._stereo:
+            # Filter the Left - Right component.
+            _lmr = self._scratch("lmr", _tmp.shape, _tmp.dtype)
+            self._xp.multiply(self._pll.image(2), _tmp, out=_lmr)
+            _lmr *= 1.0175
+
+            # Mix L+R and L-R to generate L and R
+            self._xp.add(_tmp, _lmr, out=_mix[0])
+            self._xp.subtract(_tmp, _lmr, out=_mix[1])
+        else:
+            _mix = _mix[:1]
+            _mix[0] = _tmp
+
+        # Hold back the end of the composite for the next block.
+        if _delay:
+            self._composite[:_delay] = self._composite[self._input_size:]
+
+        _dec = self._scratch("dec", (2, self._output_size), "float32")
+        _mix = self._decimate.run(_mix, out=_dec[:len(_mix)])
+
+        # Deemphasize channels into the output layout.
+        if self._cuda and numpy_output:
+            _lr = self._scratch("lr", self._shape, "float32")
+        else:
+            _lr = self._output(out, self._shape, "float32")
 
-        # Stack channels.
-        _lr = self._xp.dstack((_l, _r))
+        _rows = _lr[0].T if self._layout == "interleaved" else _lr
+        self._deemphasis.run(_mix, out=_rows[:len(_mix)])
+        if not self._stereo:
+            _rows[1] = _rows[0]
 
         # Remove DC.
         _lr -= self._xp.mean(_lr)
 
         # Ensure Bounds
-        _lr = self._xp.clip(_lr, -0.999, 0.999)
+        self._xp.clip(_lr, -0.999, 0.999, out=_lr)
 
         if self._cuda and numpy_output:
-            _lr = self._xp.asnumpy(_lr)
+            return self._host(_lr, out)
 
         return _lr
+
+    def _dummy(self):
+        return self._xp.zeros(self._input_size, dtype="complex64")
+
+    def __detect(self, composite) -> bool:
+        # Pilot power from the bin of each period, relative to the power
+        # of the composite signal, with hysteresis.
+        _period = self._pilot.shape[0]
+        _count = len(composite) // _period
+        _tmp = composite[:_count * _period].reshape(_count, _period)
+        _tmp = self._xp.matmul(_tmp, self._pilot)
+
+        _pilot = 2 * float(self._xp.sum(_tmp * _tmp)) / (_count * _period)
+        _total = float(self._xp.dot(composite, composite)) * _period
+        _total /= len(composite)
+
+        _threshold = self._pilot_threshold - (3.0 if self._stereo else 0.0)
+        return _pilot > _total * (10 ** (_threshold / 10))
@@ -1,6 +1,8 @@
 """Imports all modules from radio.tools."""
 
 from radiocore.tools.tuner import *
+from radiocore.tools.xlating import *
+from radiocore.tools.dispatcher import *
 from radiocore.tools.buffer import *
 from radiocore.tools.chopper import *
 from radiocore.tools.carrousel import *
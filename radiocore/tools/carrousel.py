@@ -1,9 +1,11 @@
 """Defines a Carrousel module."""
 
+from threading import Condition
 from contextlib import contextmanager
 from typing import List
 
 from radiocore.tools import Buffer
+from radiocore.tools.ringbuffer import _OVERFLOW_POLICIES
 
 
 class Carrousel:
@@ -16,23 +18,39 @@ class Carrousel:
 
     This class doesn't support multiple producers.
 
+    The overflow policy sets what happens when an item is enqueued while
+    all of them are in use, like the RingBuffer: drop_oldest discards the
+    oldest item, drop_newest discards the new one, block waits for an item
+    to be dequeued and discards the new one after the timeout, and raise
+    raises a ValueError. A discarded new item is yielded as None.
+
     Parameters
     ----------
     items : arr
         array of items to be cycled through
     print_overflow : bool, optional
-        print 'overflow' in stdout whenever some happens (default is True)
+        print 'overflow' in stdout whenever some happens (default is False)
+    overflow : str, optional
+        overflow policy, drop_oldest, drop_newest, block or raise
+        (default is drop_oldest)
     """
 
-    def __init__(self, items: List, print_overflow: bool = True):
+    def __init__(self, items: List, print_overflow: bool = False,
+                 overflow: str = "drop_oldest"):
         """Initialize the Carrousel class."""
+        if overflow not in _OVERFLOW_POLICIES:
+            raise ValueError(f"invalid overflow policy ({overflow})")
+
         self._items: List = items
         self._head: int = 0
         self._tail: int = 0
         self._overflow: int = 0
+        self._high_water: int = 0
         self._occupancy: int = 0
         self._capacity: int = len(self._items)
         self._print_overflow: bool = print_overflow
+        self._policy: str = overflow
+        self._cv = Condition()
 
     @property
     def occupancy(self) -> int:
@@ -59,6 +77,16 @@ class Carrousel:
         """Return the number of overflows since the instantiation."""
         return self._overflow
 
+    @property
+    def dropped(self) -> int:
+        """Return the number of items dropped by overflows."""
+        return self._overflow
+
+    @property
+    def high_water(self) -> int:
+        """Return the highest occupancy since the instantiation."""
+        return self._high_water
+
     @property
     def is_healthy(self) -> bool:
         """
@@ -79,15 +107,19 @@ class Carrousel:
         return self._items.__str__()
 
     @contextmanager
-    def enqueue(self):
-        """Return the reference of an item to be written into."""
-        if self.is_full:
-            self._overflow += 1
-            self._occupancy -= 1
-            self._head = (self._head + 1) % self.capacity
+    def enqueue(self, timeout: float = 3.0):
+        """
+        Return the reference of an item to be written into.
 
-            if self._print_overflow:
-                print("overflow")
+        Parameters
+        ----------
+        timeout : float, optional
+            how long in seconds the block policy should wait for an item
+            (default is 3)
+        """
+        if self.is_full and not self.__overflow(timeout):
+            yield None
+            return
 
         try:
             _item = self._items[self._tail]
@@ -97,8 +129,10 @@ class Carrousel:
             else:
                 yield _item
         finally:
-            self._occupancy += 1
-            self._tail = (self._tail + 1) % self.capacity
+            with self._cv:
+                self._occupancy += 1
+                self._tail = (self._tail + 1) % self.capacity
+                self._high_water = max(self._high_water, self._occupancy)
 
     @contextmanager
     def dequeue(self):
@@ -114,5 +148,33 @@ class Carrousel:
             else:
                 yield _item
         finally:
+            with self._cv:
+                self._occupancy -= 1
+                self._head = (self._head + 1) % self.capacity
+                self._cv.notify_all()
+
+    def __overflow(self, timeout: float) -> bool:
+        # Apply the overflow policy to an enqueue while all the items are
+        # in use. Returns if the new item should be written.
+        _policy = self._policy
+        if _policy == "block":
+            with self._cv:
+                if self._cv.wait_for(lambda: not self.is_full, timeout):
+                    return True
+            _policy = "drop_newest"
+
+        self._overflow += 1
+        if _policy == "raise":
+            raise ValueError("carrousel is full")
+
+        if self._print_overflow:
+            print("overflow")
+
+        if _policy == "drop_newest":
+            return False
+
+        with self._cv:
             self._occupancy -= 1
             self._head = (self._head + 1) % self.capacity
+
+        return True
@@ -0,0 +1,257 @@
+"""Defines a Dispatcher module."""
+
+import os
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union
+
+import numpy as np
+
+from radiocore.tools.tuner import Tuner
+
+
+class Dispatcher:
+    """
+    The Dispatcher class demodulates the channels of a Tuner in parallel.
+
+    Each channel is channelized and demodulated by a worker of a thread
+    pool. The FFT and most of the array operations release the GIL, so
+    the channels are processed concurrently. The Tuner should be loaded
+    in advance of run().
+
+    With processes enabled, the channels are split in shards between
+    worker processes instead. The Tuner loads the spectrum of every
+    block into a shared memory segment, see Tuner.share_spectrum(), read
+    by the workers without copying, and the outputs are returned through
+    shared memory. Each worker owns a copy of the Tuner and the
+    demodulators of its shard, started by the first run(), so the
+    demodulator states are kept by the workers. When the Tuner makes a
+    new plan, e.g. on a change of the FFT workers, the plan is sent to
+    the workers by the next run(). Only the Tuner class on the CPU is
+    supported, and the channel layout should not change after the first
+    run().
+
+    Parameters
+    ----------
+    tuner : Tuner
+        tuner with the registered channels and demodulators
+    workers : int, optional
+        maximum number of workers (default is the CPU count)
+    processes : bool
+        use worker processes instead of threads (default is False)
+    """
+
+    def __init__(self,
+                 tuner: Tuner,
+                 workers: Union[int, None] = None,
+                 processes: bool = False):
+        """Initialize the Dispatcher class."""
+        self._tuner: Tuner = tuner
+        self._workers: int = int(workers or os.cpu_count() or 1)
+        self._processes: bool = bool(processes)
+        self._pool = None
+        self._shards = None
+        self._spectrum = None
+        self._generation = None
+        self._views = {}
+
+        if not self._processes:
+            self._pool = ThreadPoolExecutor(max_workers=self._workers)
+            return
+
+        if type(tuner) is not Tuner or tuner._cuda:
+            raise ValueError("processes only support the Tuner class on "
+                             "the CPU")
+
+    @property
+    def workers(self) -> int:
+        """Return the maximum number of workers."""
+        return self._workers
+
+    def run(self) -> List:
+        """
+        Channelize and demodulate every channel of the loaded Tuner.
+
+        Channels without a demodulator return the channelized signal.
+        Channels closed by their squelch are skipped and return None.
+
+        Returns
+        -------
+        output : list of arr
+            demodulator outputs in the same order as tuner.channels()
+        """
+        if not self._processes:
+            return list(self._pool.map(self.__work,
+                                       self._tuner.channels()))
+
+        if self._shards is None:
+            self.__start(self._tuner.spectrum)
+
+        if self._tuner.spectrum is not self._spectrum[1]:
+            raise ValueError("spectrum size changed since the first run()")
+
+        # Workers run the channels with the plan of the spectrum.
+        _plan = None
+        if self._generation != self._tuner._generation:
+            _plan = self._tuner._save_plan()
+            self._generation = self._tuner._generation
+
+        _active = [_ch.active for _ch in self._tuner.channels()]
+        for _conn, _ in self._shards:
+            _conn.send((_plan, _active))
+
+        _outputs = [None] * len(self._tuner.channels())
+        for _conn, _ in self._shards:
+            _reply = _conn.recv()
+            if isinstance(_reply, Exception):
+                raise _reply
+
+            for _index, _name, _shape, _dtype in _reply:
+                _outputs[_index] = self.__output(_index, _name, _shape,
+                                                 _dtype)
+
+        return _outputs
+
+    def shutdown(self):
+        """Stop the workers."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+        if self._shards is not None:
+            for _conn, _process in self._shards:
+                _conn.send(None)
+                _process.join()
+                _conn.close()
+            self._shards = None
+
+        # Arrays are released before the segments they map.
+        _segments = [_view[0] for _view in self._views.values()]
+        self._views = {}
+        if self._spectrum is not None:
+            if self._tuner.spectrum is self._spectrum[1]:
+                self._tuner.share_spectrum(None)
+            _segments.append(self._spectrum[0])
+            self._spectrum = None
+            _segments[-1].unlink()
+
+        for _shm in _segments:
+            _shm.close()
+
+    def __enter__(self):
+        """Return the Dispatcher instance."""
+        return self
+
+    def __exit__(self, *args):
+        """Stop the workers."""
+        self.shutdown()
+
+    def __work(self, channel):
+        if not channel.active:
+            return None
+
+        _tmp = self._tuner.run(channel.index)
+
+        if channel.demodulator is None:
+            return _tmp
+
+        return channel.demodulator.run(_tmp)
+
+    def __start(self, spectrum):
+        if spectrum is None:
+            raise ValueError("tuner should be loaded in advance of run()")
+
+        _shm = shared_memory.SharedMemory(create=True, size=spectrum.nbytes)
+        _arr = np.ndarray(spectrum.shape, spectrum.dtype, buffer=_shm.buf)
+        self._spectrum = (_shm, _arr)
+        self._generation = self._tuner._generation
+
+        # Channels are dealt round-robin, so the shards have a similar
+        # mix of bandwidths and demodulators.
+        _count = min(self._workers, len(self._tuner.channels()))
+        _ctx = multiprocessing.get_context()
+        self._shards = []
+
+        for _w in range(_count):
+            _indices = list(range(_w, len(self._tuner.channels()), _count))
+            _conn, _child = _ctx.Pipe()
+            _process = _ctx.Process(target=_serve, daemon=True,
+                                    args=(_child, self._tuner, _indices,
+                                          _shm.name, spectrum.shape,
+                                          spectrum.dtype.str))
+            _process.start()
+            _child.close()
+            self._shards.append((_conn, _process))
+
+        self._tuner.share_spectrum(_arr)
+
+    def __output(self, index: int, name: str, shape, dtype: str):
+        # The output is copied out of the segment, so it stays valid
+        # after the next run() and the segment can be closed anytime.
+        if index not in self._views or self._views[index][0].name != name:
+            if index in self._views:
+                self._views.pop(index)[0].close()
+
+            _shm = shared_memory.SharedMemory(name=name)
+            self._views[index] = (_shm, np.ndarray(shape, dtype,
+                                                   buffer=_shm.buf))
+
+        return self._views[index][1].copy()
+
+
+def _serve(conn, tuner: Tuner, indices: List[int], name: str, shape,
+           dtype: str):
+    # Worker process loop. Runs one block per message until None. Each
+    # message holds the new plan of the Tuner, if any, and the squelch
+    # state of the channels. The output segments are reallocated only if
+    # their shape changes.
+    _shm = shared_memory.SharedMemory(name=name)
+    _spectrum = np.ndarray(shape, dtype, buffer=_shm.buf)
+    tuner.load_spectrum(_spectrum)
+    _outputs = {}
+
+    try:
+        while True:
+            _message = conn.recv()
+            if _message is None:
+                break
+
+            try:
+                _plan, _active = _message
+                if _plan is not None:
+                    tuner._load_plan(_plan)
+                    tuner.load_spectrum(_spectrum)
+
+                _reply = []
+                for _index in indices:
+                    if not _active[_index]:
+                        continue
+
+                    _tmp = tuner.run(_index)
+                    _demod = tuner.channels()[_index].demodulator
+                    if _demod is not None:
+                        _tmp = _demod.run(_tmp)
+                    _tmp = np.asarray(_tmp)
+
+                    _out = _outputs.get(_index)
+                    if _out is None or _out[1].shape != _tmp.shape or \
+                            _out[1].dtype != _tmp.dtype:
+                        if _out is not None:
+                            _out[0].unlink()
+                        _seg = shared_memory.SharedMemory(
+                            create=True, size=max(_tmp.nbytes, 1))
+                        _out = (_seg, np.ndarray(_tmp.shape, _tmp.dtype,
+                                                 buffer=_seg.buf))
+                        _outputs[_index] = _out
+
+                    _out[1][...] = _tmp
+                    _reply.append((_index, _out[0].name, _tmp.shape,
+                                   _tmp.dtype.str))
+                conn.send(_reply)
+            except Exception as _err:
+                conn.send(_err)
+    finally:
+        # The mappings are released when the process exits.
+        for _seg, _ in _outputs.values():
+            _seg.unlink()
+        conn.close()
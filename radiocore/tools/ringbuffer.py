@@ -1,11 +1,20 @@
 """Defines a Ring Buffer module."""
 
+import os
+import mmap
+import ctypes
 import atomics
-from threading import Event
-from typing import Union
+from threading import Condition
+from typing import Tuple, Union
 
 from radiocore._internal import Injector
 
+# Flag of mmap() to place a mapping at an exact address (Linux).
+_MAP_FIXED: int = 0x10
+
+# Policies applied when a write doesn't fit in the buffer.
+_OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block", "raise")
+
 
 class RingBuffer(Injector):
     """
@@ -14,6 +23,31 @@ class RingBuffer(Injector):
     The CUDA (GPU) backbuffer is allocated by cuSignal. The memory is
     managed. Therefore, it's DMA'ed to the CPU automatically.
 
+    With mirrored enabled, the CPU backbuffer is a memory file mapped
+    twice back-to-back, so the element after the last one is the first
+    one again. Any span of the buffer is a contiguous array, so
+    read_view() and reserve() hand out a single span without copying. The
+    capacity is rounded up to a whole number of memory pages. This
+    option is only available on Linux.
+
+    The ring buffer supports a single producer and a single consumer
+    thread. The producer owns the write cursor and the consumer owns the
+    read cursor. Both cursors count the elements since the last reset
+    and are atomics, so each side only loads the cursor of the other.
+    An element is written before its cursor is advanced, so the other
+    side never sees it early. Only a thread that has to wait takes a
+    lock, and the other side wakes it up after moving its cursor. The
+    consumer side is a RingReader, see FanoutRingBuffer for many readers.
+
+    The overflow policy sets what happens when a write doesn't fit:
+    drop_oldest discards just enough of the oldest elements to make room,
+    drop_newest writes only what fits, block waits for the consumer to
+    make room and drops the newest elements after the timeout, and raise
+    raises a ValueError. With drop_oldest, the elements discarded can
+    belong to a read_view() still in use. The overflows, the elements
+    dropped and the high-water mark of the occupancy are counted since
+    the instantiation.
+
     Parameters
     ----------
     capacity : int, float
@@ -23,36 +57,60 @@ class RingBuffer(Injector):
     cuda : bool, optional
         allocate memory on the GPU (default is False)
     print_overflow : bool, optional
-        print to stdout if buffer overflow happens (default is True)
+        print to stdout if buffer overflow happens (default is False)
     allow_overflow : bool, optional
-        let overflow happen without raising an exception (default is True)
+        let overflow happen without raising an exception, False is the
+        same as the raise policy (default is True)
+    mirrored : bool, optional
+        map the CPU backbuffer twice back-to-back (default is False)
+    overflow : str, optional
+        overflow policy, drop_oldest, drop_newest, block or raise
+        (default is drop_oldest)
     """
 
     def __init__(self,
                  capacity: Union[int, float],
                  dtype: str = "complex64",
                  cuda: bool = False,
-                 print_overflow: bool = True,
-                 allow_overflow: bool = True):
+                 print_overflow: bool = False,
+                 allow_overflow: bool = True,
+                 mirrored: bool = False,
+                 overflow: str = "drop_oldest"):
         """Initialize the Ring Buffer class."""
+        if overflow not in _OVERFLOW_POLICIES:
+            raise ValueError(f"invalid overflow policy ({overflow})")
+
         self._print_overflow: bool = print_overflow
-        self._allow_overflow: bool = allow_overflow
+        self._policy: str = overflow if allow_overflow else "raise"
+        self._overflows: int = 0
+        self._dropped: int = 0
+        self._high_water: int = 0
         self._capacity: int = int(capacity)
         self._cuda: bool = cuda
         self._dtype = dtype
-        self._cv = Event()
-        self._head: int = 0
-        self._tail: int = 0
-        self._occupancy = atomics.atomic(width=4, atype=atomics.INT)
+        self._cv = Condition()
+        self._waiting = atomics.atomic(width=4, atype=atomics.INT)
+        self._written = atomics.atomic(width=8, atype=atomics.UINT)
+        self._reserved: int = 0
+        self._mirror = None
 
         super().__init__(self._cuda)
 
-        if self._cuda:
+        if mirrored:
+            if self._cuda or not hasattr(os, "memfd_create"):
+                raise ValueError("mirrored buffers are only supported on "
+                                 "the CPU on Linux")
+            self.__map()
+            self._buffer = self._mirror[:self._capacity]
+        elif self._cuda:
             self._buffer = self._xs.get_shared_mem(self._capacity,
                                                    dtype=self._dtype)
         else:
             self._buffer = self._np.zeros(self._capacity, dtype=self._dtype)
 
+        self._reader = RingReader(self)
+        self._readers = (self._reader,)
+
     @property
     def capacity(self) -> int:
         """Return buffer capacity."""
@@ -61,38 +119,92 @@ class RingBuffer(Injector):
     @property
     def occupancy(self) -> int:
         """Return the current buffer occupancy. Used space."""
-        return self._occupancy.load()
+        # The read cursors are loaded first, they never pass the write one.
+        _read = [_reader._read.load() for _reader in self._readers]
+        _written = self._written.load()
+        return _written - min(_read, default=_written)
 
     @property
     def vacancy(self) -> int:
         """Return the current buffer vacancy. Space left."""
         return self.capacity - self.occupancy
 
+    @property
+    def overflow(self) -> int:
+        """Return the number of overflows since the instantiation."""
+        return self._overflows
+
+    @property
+    def dropped(self) -> int:
+        """Return the number of elements dropped by overflows."""
+        return self._dropped
+
+    @property
+    def high_water(self) -> int:
+        """Return the highest occupancy since the instantiation."""
+        return self._high_water
+
+    @property
+    def is_mirrored(self) -> bool:
+        """Return if the backbuffer is mapped twice back-to-back."""
+        return self._mirror is not None
+
     @property
     def data(self):
         """Return the backbuffer. Use with care."""
         return self._buffer
 
     def reset(self):
-        """Reset ringbuffer state."""
-        self._tail = 0
-        self._head = 0
-        self._occupancy.store(0)
+        """Reset ringbuffer state. Not safe while in use by other threads."""
+        for _reader in self._readers:
+            _reader._read.store(0)
+            _reader._view = None
+        self._written.store(0)
 
     def __str__(self) -> str:
         """Return printable version of the backbuffer."""
         return self._buffer.__str__()
 
-    def __copy(self, dst, src, size):
-        if size == 0:
-            return
-
-        if size < 0:
-            raise ValueError(f"Copy size is negative! ({size})")
-
-        dst[:size] = src[:size]
-
-    def put(self, buffer):
+    def __map(self):
+        # The memory file is mapped at twice its size, then the upper half
+        # is replaced by a second mapping of the file. The mmap object owns
+        # the whole range and unmaps both when released.
+        _itemsize = self._np.dtype(self._dtype).itemsize
+        if (mmap.PAGESIZE % _itemsize) != 0:
+            raise ValueError("dtype size should divide the memory page size")
+
+        _pages = -(-(self._capacity * _itemsize) // mmap.PAGESIZE)
+        _size = max(_pages, 1) * mmap.PAGESIZE
+
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _libc.mmap.restype = ctypes.c_void_p
+        _libc.mmap.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int,
+                               ctypes.c_int, ctypes.c_int, ctypes.c_long)
+
+        _fd = os.memfd_create("radiocore-ringbuffer")
+        try:
+            os.ftruncate(_fd, 2 * _size)
+            _map = mmap.mmap(_fd, 2 * _size)
+
+            _char = ctypes.c_char.from_buffer(_map)
+            _address = ctypes.addressof(_char) + _size
+            del _char
+
+            _ret = _libc.mmap(_address, _size,
+                              mmap.PROT_READ | mmap.PROT_WRITE,
+                              mmap.MAP_SHARED | _MAP_FIXED, _fd, 0)
+            if _ret != _address:
+                _map.close()
+                raise OSError(ctypes.get_errno(), "mirror mapping failed")
+
+            os.ftruncate(_fd, _size)
+        finally:
+            os.close(_fd)
+
+        self._capacity = _size // _itemsize
+        self._mirror = self._np.frombuffer(_map, dtype=self._dtype)
+
+    def put(self, buffer, timeout: float = 3.0):
         """
         Copy all buffer elements into ring buffer.
 
@@ -100,31 +212,349 @@ class RingBuffer(Injector):
         ----------
         buffer : ndarray
             array containing the elements to be copied
+        timeout : float, optional
+            how long in seconds the block policy should wait for space
+            (default is 3)
         """
-        _size: int = len(buffer)
+        _first, _second = self.reserve(len(buffer), timeout)
+
+        _copy(_first, buffer, len(_first))
+        _copy(_second, buffer[len(_first):], len(_second))
+
+        _size = len(_first) + len(_second)
+        self.commit(_size)
+
+        # The newest elements didn't fit.
+        if _size < len(buffer):
+            self._overflows += 1
+            self._dropped += len(buffer) - _size
+            if self._print_overflow:
+                print("overflow")
+
+    def reserve(self, size: int, timeout: float = 3.0):
+        """
+        Return the space of the next size elements to be written into.
+
+        The space is returned as two arrays, the second one holds the
+        elements that wrap around the end of the backbuffer and is empty
+        if there are none. With mirrored enabled, it's always empty. The
+        elements are published to the readers by commit(). If the size
+        doesn't fit, the overflow policy applies, so the space might be
+        shorter than size. Unlike put(), a shorter space isn't counted as
+        an overflow, the producer just writes fewer elements.
+
+        Parameters
+        ----------
+        size : int
+            number of elements
+        timeout : float, optional
+            how long in seconds the block policy should wait for space
+            (default is 3)
+
+        Returns
+        -------
+        spans : tuple of ndarray
+            first and second writable views of the backbuffer
+        """
+        _size: int = int(size)
 
         if _size > self.capacity:
             raise ValueError("Input buffer is bigger than ring capacity.")
 
         if _size > self.vacancy:
-            if not self._allow_overflow:
-                raise ValueError("Overflow happened.")
+            _size = self.__overflow(_size, timeout)
 
-            if self._print_overflow:
-                print("overflow")
+        self._reserved = _size
+        _head = self._written.load() % self.capacity
+
+        if self._mirror is not None:
+            return (self._mirror[_head:_head + _size], self._mirror[:0])
+
+        _copy_len_a = min(_size, self.capacity - _head)
+        return (self._buffer[_head:_head + _copy_len_a],
+                self._buffer[:_size - _copy_len_a])
+
+    def commit(self, size: int):
+        """
+        Publish the first size elements of the last reserve().
+
+        Parameters
+        ----------
+        size : int
+            number of elements written, at most the reserved size
+        """
+        _size: int = int(size)
+
+        if _size > self._reserved:
+            raise ValueError("Commit size is bigger than the reserved size.")
+
+        self._reserved = 0
+        self._written.add(_size)
+        self._high_water = max(self._high_water, self.occupancy)
+        self._notify()
+
+    def get(self, buffer, timeout: float = 3.0):
+        """
+        Fill all buffer elements with the ring buffer data.
+
+        Parameters
+        ----------
+        buffer : ndarray
+            array where the elements will be copied into
+        timeout : float, optional
+            how long in seconds the function should wait (default is 3)
+        """
+        return self.__own_reader().get(buffer, timeout)
+
+    def get_available(self, max_size: int, out=None, timeout: float = 3.0):
+        """
+        Return up to max_size elements of the ring buffer.
+
+        Waits for at least one element and returns all of the available
+        ones up to max_size, so the consumer doesn't need to poll.
+
+        Parameters
+        ----------
+        max_size : int
+            maximum number of elements
+        out : ndarray, optional
+            output buffer with at least max_size elements
+        timeout : float, optional
+            how long in seconds the function should wait (default is 3)
+
+        Returns
+        -------
+        output : ndarray or None
+            copy of the elements, the first elements of out if given,
+            None if the timeout was reached
+        """
+        return self.__own_reader().get_available(max_size, out, timeout)
+
+    def read_view(self, size: int, timeout: float = 3.0):
+        """
+        Return the next size elements of the ring buffer.
+
+        The elements stay in the ring buffer until release() is called.
+        With mirrored enabled, or if the elements don't wrap around, the
+        returned array is a view of the backbuffer. Otherwise, it's a
+        copy reused by the next call.
+
+        Parameters
+        ----------
+        size : int
+            number of elements
+        timeout : float, optional
+            how long in seconds the function should wait (default is 3)
+
+        Returns
+        -------
+        view : ndarray or None
+            array of the elements, None if the timeout was reached
+        """
+        return self.__own_reader().read_view(size, timeout)
+
+    def release(self, size: int):
+        """
+        Remove the first size elements from the ring buffer.
+
+        Parameters
+        ----------
+        size : int
+            number of elements, usually the size of read_view()
+        """
+        self.__own_reader().release(size)
+
+    def __own_reader(self) -> "RingReader":
+        if self._reader is None:
+            raise ValueError("elements are read through the readers")
+        return self._reader
+
+    def __overflow(self, size: int, timeout: float) -> int:
+        # Apply the overflow policy to a write of size elements that
+        # doesn't fit. Returns the number of elements to be written.
+        # Detachable readers holding back the write are detached first.
+        _position = self._written.load() + size - self.capacity
+        for _reader in self._readers:
+            if _reader._detachable and _reader._read.load() < _position:
+                self._detach(_reader)
+
+        if size <= self.vacancy:
+            return size
+
+        _policy = self._policy
+        if _policy == "block":
+            if self._wait(lambda: self.vacancy >= size, timeout):
+                return size
+            _policy = "drop_newest"
+
+        # The space is shorter, put() counts the elements it drops.
+        if _policy == "drop_newest":
+            return self.vacancy
+
+        self._overflows += 1
+        if _policy == "raise":
+            raise ValueError("Overflow happened.")
+
+        if self._print_overflow:
+            print("overflow")
+
+        _position = self._written.load() + size - self.capacity
+        self._dropped += max((_reader._discard(_position)
+                              for _reader in self._readers), default=0)
+        return size
+
+    def _detach(self, reader: "RingReader"):
+        # Stop the reader from holding elements, waking it up if waiting.
+        with self._cv:
+            self._readers = tuple(_reader for _reader in self._readers
+                                  if _reader is not reader)
+            reader._detached = True
+            self._cv.notify_all()
+
+    def _wait(self, predicate, timeout: float) -> bool:
+        # Wait until the predicate is true or the timeout is reached.
+        if predicate():
+            return True
+
+        with self._cv:
+            self._waiting.inc()
+            try:
+                return self._cv.wait_for(predicate, timeout)
+            finally:
+                self._waiting.dec()
+
+    def _notify(self):
+        # A waiting thread flags it before checking its predicate, and the
+        # flag is checked after moving a cursor, so no wakeup is missed.
+        if self._waiting.load():
+            with self._cv:
+                self._cv.notify_all()
+
+
+class FanoutRingBuffer(RingBuffer):
+    """
+    The Fanout Ring Buffer class feeds the elements of one writer to many.
+
+    Each reader registered by add_reader() has its own read cursor and
+    reads every element written after it was added. The elements are
+    written once and the read views of all the readers share the
+    backbuffer, so there are no copies per reader. The occupancy and the
+    overflows are measured against the slowest reader.
+
+    Readers added as detachable are detached instead of causing an
+    overflow, so a stalled reader doesn't make the others lose elements.
+    The elements are read through the readers, the ring buffer itself
+    raises a ValueError on reads.
+
+    Parameters
+    ----------
+    capacity : int, float
+        maximum capacity of the backbuffer
+    dtype : str, optional
+        element type of the array (default is complex64)
+    cuda : bool, optional
+        allocate memory on the GPU (default is False)
+    print_overflow : bool, optional
+        print to stdout if buffer overflow happens (default is False)
+    mirrored : bool, optional
+        map the CPU backbuffer twice back-to-back (default is False)
+    overflow : str, optional
+        overflow policy, drop_oldest, drop_newest, block or raise
+        (default is drop_oldest)
+    """
+
+    def __init__(self,
+                 capacity: Union[int, float],
+                 dtype: str = "complex64",
+                 cuda: bool = False,
+                 print_overflow: bool = False,
+                 mirrored: bool = False,
+                 overflow: str = "drop_oldest"):
+        """Initialize the Fanout Ring Buffer class."""
+        super().__init__(capacity, dtype=dtype, cuda=cuda,
+                         print_overflow=print_overflow, mirrored=mirrored,
+                         overflow=overflow)
+
+        self._reader = None
+        self._readers = ()
+
+    @property
+    def readers(self) -> Tuple["RingReader", ...]:
+        """Return the readers attached to the ring buffer."""
+        return self._readers
 
-            self.reset()
+    def add_reader(self, detachable: bool = False) -> "RingReader":
+        """
+        Attach a new reader to the ring buffer.
+
+        Parameters
+        ----------
+        detachable : bool, optional
+            detach the reader when it would cause an overflow
+            (default is False)
+
+        Returns
+        -------
+        reader : RingReader
+            reader of the elements written from now on
+        """
+        _reader = RingReader(self, detachable)
+        with self._cv:
+            self._readers += (_reader,)
+
+        return _reader
 
-        _copy_len_a = min(_size, self.capacity - self._head)
-        _copy_len_b = _size - _copy_len_a if (_copy_len_a < _size) else 0
+    def remove_reader(self, reader: "RingReader"):
+        """
+        Detach the reader from the ring buffer.
+
+        Parameters
+        ----------
+        reader : RingReader
+            reader returned by add_reader()
+        """
+        self._detach(reader)
 
-        self.__copy(self._buffer[self._head:], buffer, _copy_len_a)
-        self.__copy(self._buffer, buffer[_copy_len_a:], _copy_len_b)
 
-        self._head = (self._head + _size) % self.capacity
-        self._occupancy.add(_size)
+class RingReader(Injector):
+    """
+    The Ring Reader class reads the elements of a ring buffer.
 
-        self._cv.set()
+    Each reader has its own read cursor, so many of them can read the
+    same elements of a FanoutRingBuffer. A detached reader doesn't hold
+    the elements anymore and its reads raise a ValueError.
+
+    Parameters
+    ----------
+    ring : RingBuffer
+        ring buffer to be read
+    detachable : bool, optional
+        detach the reader when it would cause an overflow
+        (default is False)
+    """
+
+    def __init__(self, ring: RingBuffer, detachable: bool = False):
+        """Initialize the Ring Reader class."""
+        self._ring = ring
+        self._detachable: bool = detachable
+        self._detached: bool = False
+        self._read = atomics.atomic(width=8, atype=atomics.UINT)
+        self._read.store(ring._written.load())
+        self._view: Union[int, None] = None
+
+        super().__init__(ring._cuda)
+
+    @property
+    def occupancy(self) -> int:
+        """Return the number of elements left to be read."""
+        # The read cursor is loaded first, it never passes the write one.
+        _read = self._read.load()
+        return self._ring._written.load() - _read
+
+    @property
+    def is_detached(self) -> bool:
+        """Return if the reader was detached from the ring buffer."""
+        return self._detached
 
     def get(self, buffer, timeout: float = 3.0):
         """
@@ -139,22 +569,169 @@ class RingBuffer(Injector):
         """
         _size: int = len(buffer)
 
-        if _size > self.capacity:
+        if _size > self._ring.capacity:
             raise ValueError("Input buffer is bigger than ring capacity.")
 
-        while _size > self.occupancy:
-            if not self._cv.wait(timeout):
-                # Timeout reached. Retuning.
-                return
-            self._cv.clear()
+        if not self.__wait(_size, timeout):
+            # Timeout reached. Retuning.
+            return
+
+        self.__copy_out(buffer, _size)
+        self.release(_size)
 
-        _copy_len_a = min(_size, self.capacity - self._tail)
-        _copy_len_b = _size - _copy_len_a if (_copy_len_a < _size) else 0
+        return True
 
-        self.__copy(buffer, self._buffer[self._tail:], _copy_len_a)
-        self.__copy(buffer[_copy_len_a:], self._buffer, _copy_len_b)
+    def get_available(self, max_size: int, out=None, timeout: float = 3.0):
+        """
+        Return up to max_size elements of the ring buffer.
 
-        self._tail = (self._tail + _size) % self.capacity
-        self._occupancy.sub(_size)
+        Waits for at least one element and returns all of the available
+        ones up to max_size, so the consumer doesn't need to poll.
 
-        return True
+        Parameters
+        ----------
+        max_size : int
+            maximum number of elements
+        out : ndarray, optional
+            output buffer with at least max_size elements
+        timeout : float, optional
+            how long in seconds the function should wait (default is 3)
+
+        Returns
+        -------
+        output : ndarray or None
+            copy of the elements, the first elements of out if given,
+            None if the timeout was reached
+        """
+        if not self.__wait(1, timeout):
+            return
+
+        _size = min(self.occupancy, int(max_size))
+
+        if out is None:
+            out = self._xp.empty(_size, dtype=self._ring._dtype)
+        self.__copy_out(out, _size)
+        self.release(_size)
+
+        return out[:_size]
+
+    def read_view(self, size: int, timeout: float = 3.0):
+        """
+        Return the next size elements of the ring buffer.
+
+        The elements stay in the ring buffer until release() is called.
+        With mirrored enabled, or if the elements don't wrap around, the
+        returned array is a view of the backbuffer. Otherwise, it's a
+        copy reused by the next call.
+
+        Parameters
+        ----------
+        size : int
+            number of elements
+        timeout : float, optional
+            how long in seconds the function should wait (default is 3)
+
+        Returns
+        -------
+        view : ndarray or None
+            array of the elements, None if the timeout was reached
+        """
+        _size: int = int(size)
+        _ring = self._ring
+
+        if _size > _ring.capacity:
+            raise ValueError("Input buffer is bigger than ring capacity.")
+
+        if not self.__wait(_size, timeout):
+            # Timeout reached. Retuning.
+            return
+
+        self._view = self._read.load()
+        _tail = self._view % _ring.capacity
+
+        if _ring._mirror is not None:
+            return _ring._mirror[_tail:_tail + _size]
+
+        _copy_len_a = min(_size, _ring.capacity - _tail)
+        if _copy_len_a == _size:
+            return _ring._buffer[_tail:_tail + _size]
+
+        _view = self._scratch("view", (_size,), _ring._dtype)
+        _copy(_view, _ring._buffer[_tail:], _copy_len_a)
+        _copy(_view[_copy_len_a:], _ring._buffer, _size - _copy_len_a)
+
+        return _view
+
+    def release(self, size: int):
+        """
+        Remove the first size elements from the ring buffer.
+
+        Parameters
+        ----------
+        size : int
+            number of elements, usually the size of read_view()
+        """
+        _size: int = int(size)
+        _read = self._read.load()
+
+        if self._detached:
+            raise ValueError("Reader is detached from the ring buffer.")
+
+        # Count from where the view started, the producer might have
+        # discarded some of its elements meanwhile.
+        _start = _read if self._view is None else self._view
+        self._view = None
+
+        if _size > self._ring._written.load() - _start:
+            raise ValueError("Release size is bigger than the occupancy.")
+
+        self._discard(_start + _size)
+        self._ring._notify()
+
+    def __copy_out(self, out, size: int):
+        # Copy the next size elements straight into out, in two spans
+        # if they wrap around the backbuffer.
+        _ring = self._ring
+        self._view = self._read.load()
+        _tail = self._view % _ring.capacity
+
+        if _ring._mirror is not None:
+            _copy(out, _ring._mirror[_tail:], size)
+            return
+
+        _copy_len_a = min(size, _ring.capacity - _tail)
+        _copy(out, _ring._buffer[_tail:], _copy_len_a)
+        _copy(out[_copy_len_a:], _ring._buffer, size - _copy_len_a)
+
+    def __wait(self, size: int, timeout: float) -> bool:
+        # Wait until size elements are readable, raising if detached.
+        _ready = self._ring._wait(
+            lambda: self._detached or self.occupancy >= size, timeout)
+
+        if self._detached:
+            raise ValueError("Reader is detached from the ring buffer.")
+
+        return _ready
+
+    def _discard(self, position: int) -> int:
+        # Move the read cursor forward to the position and return the
+        # number of elements skipped. The reader might be moving it too,
+        # so retry until one wins.
+        _read = self._read.load()
+        while _read < position:
+            _result = self._read.cmpxchg_strong(_read, position)
+            if _result.success:
+                return position - _read
+            _read = _result.expected
+
+        return 0
+
+
+def _copy(dst, src, size):
+    if size == 0:
+        return
+
+    if size < 0:
+        raise ValueError(f"Copy size is negative! ({size})")
+
+    dst[:size] = src[:size]
@@ -1,9 +1,10 @@
 """Defines a Tuner module."""
 
 from dataclasses import dataclass
-from typing import List
+from functools import partial
+from typing import List, Union
 
-from radiocore._internal import Injector
+from radiocore._internal import Injector, get_fft_workers
 
 
 @dataclass
@@ -21,6 +22,12 @@ class Channel:
         higher frequency boundary of the channel
     bandwidth : float
         bandwidth of the channel
+    squelch : float, optional
+        power in dBFS that opens the squelch, None to disable it
+    active : bool
+        channel is above the squelch, updated by Tuner.load()
+    level : float, optional
+        power of the last block in dBFS, if the squelch is enabled
     """
 
     index: int
@@ -29,6 +36,9 @@ class Channel:
     lower_frequency: float
     center_frequency: float
     higher_frequency: float
+    squelch: Union[float, None] = None
+    active: bool = True
+    level: Union[float, None] = None
 
     @property
     def address_bytes(self) -> bytes:
@@ -42,23 +52,52 @@ class Tuner(Injector):
     The operation of this class assumes that the input signal
     is arranged in one second chunks. This class is based on a
     FFT, a resampler, and a IFFT. It's quite fast in the GPU.
+    For sub-second chunks, use the StreamingTuner class.
+
+    When the channels cover a small fraction of the input bandwidth,
+    the zoom mode computes only the spectrum around each cluster of
+    channels. Each cluster is isolated by a decimating bandpass filter
+    followed by a short FFT. By default, the mode is picked from the
+    estimated cost of both modes for the registered channels.
+
+    Channels with a squelch are measured by load(). The power of a
+    channel is estimated from a subset of its bins in the spectrum, so
+    it costs about nothing. The channel turns active above the squelch
+    and inactive 3 dB below it. The Dispatcher skips inactive channels.
+    The other tuners don't measure the channels, so they don't accept a
+    squelch.
 
     Parameters
     ----------
     cuda : bool
         use the GPU for processing  (default is False)
+    zoom : bool, optional
+        force the zoom mode on or off (default is None, automatic)
     """
 
-    def __init__(self, cuda: bool = False):
+    # The squelch is measured by load().
+    _measures_squelch = True
+
+    def __init__(self, cuda: bool = False, zoom: Union[bool, None] = None):
         """Initialize the Tuner class."""
         self._cuda = cuda
+        self._zoom = zoom
         super().__init__(self._cuda)
 
-        self._win = None
+        self._zooms = None
+        self._plans = None
+        self._plan_size: int = 0
+        self._plan_workers: int = 1
+        self._generation: int = 0
+        self._split = None
+        self._rows = None
+        self._outputs = None
         self._buffer = None
+        self._shared = None
         self._input_frequency: int = 0.0
         self._input_bandwidth: int = 0.0
         self._bounds: List[Channel] = []
+        self._probes = None
 
     @property
     def input_frequency(self) -> float:
@@ -70,6 +109,16 @@ class Tuner(Injector):
         """Return the bandwidth of the input data."""
         return self._input_bandwidth
 
+    @property
+    def is_zoomed(self) -> bool:
+        """Return if the zoom mode is in use. Updated by load()."""
+        return bool(self._zooms)
+
+    @property
+    def spectrum(self):
+        """Return the spectrum of the last block, as indexed by the plan."""
+        return self._buffer
+
     def channels(self) -> List[Channel]:
         """Return list of registered channels."""
         return self._bounds
@@ -92,8 +141,10 @@ class Tuner(Injector):
                              f"minimum is {self._input_bandwidth}")
 
         self._input_bandwidth = bandwidth
+        self._invalidate()
 
-    def add_channel(self, frequency: float, bandwidth: float, demodulator):
+    def add_channel(self, frequency: float, bandwidth: float, demodulator,
+                    squelch: Union[float, None] = None):
         """
         Register a new channel to be processed.
 
@@ -107,7 +158,14 @@ class Tuner(Injector):
             output channel bandwidth
         demodulator : FM, MFM, or WBFM
             demodulator instance
+        squelch : float, optional
+            channel power in dBFS that opens the squelch, only supported
+            by the Tuner class (default is None, always active)
         """
+        if squelch is not None and not self._measures_squelch:
+            raise ValueError(f"{type(self).__name__} doesn't support the "
+                             "squelch")
+
         self._bounds.append(Channel(
             index=len(self._bounds),
             bandwidth=bandwidth,
@@ -115,6 +173,7 @@ class Tuner(Injector):
             lower_frequency=(frequency - (bandwidth / 2)),
             center_frequency=frequency,
             higher_frequency=(frequency + (bandwidth / 2)),
+            squelch=squelch,
         ))
         self.__recalculate()
 
@@ -135,30 +194,521 @@ class Tuner(Injector):
             input signal buffer with one second worth of samples
         """
         _tmp = self._xp.asarray(input_signal)
-        self._buffer = self._fft.fft(_tmp)
 
-    def run(self, channel_index: int):
+        if self._plans is None or len(_tmp) != self._plan_size or \
+                self._plan_workers != get_fft_workers():
+            self.__plan(len(_tmp), self._xp.result_type(_tmp, "complex64"))
+
+        if not self._zooms:
+            with self._fft_workers():
+                self._buffer = self.__fft(_tmp, self._shared)
+            self.__squelch()
+            return
+
+        # Prefix the input with its own tail to make the bandpass filters
+        # circular, like the spectrum of the full FFT.
+        _prefix = max([(_zoom[0].shape[1] - 1) * _zoom[1]
+                       for _zoom in self._zooms])
+        _tmp = self._xp.concatenate((_tmp[len(_tmp) - _prefix:], _tmp))
+
+        # Polyphase decimation of each cluster as a matrix product.
+        for _taps, _down, _size, _start in self._zooms:
+            _lag = _taps.shape[1] - 1
+            _zoom = self._buffer[_start:_start + _size]
+            self._polyphase_filter(_tmp[_prefix - (_lag * _down):], _taps,
+                                   _size, out=_zoom)
+            with self._fft_workers():
+                _zoom[:] = self._fft.fft(_zoom)
+
+        self.__squelch()
+
+    def load_spectrum(self, spectrum):
+        """
+        Load the spectrum of a block pre-processed by another Tuner.
+
+        The other Tuner should have the same channel layout and input
+        size. The spectrum isn't copied. It replaces load() for workers
+        that share the spectrum with the main process.
+
+        Parameters
+        ----------
+        spectrum : arr
+            spectrum property of the other Tuner
+        """
+        _size = self._plan_size
+        if self._zooms:
+            _size = sum([_zoom[2] for _zoom in self._zooms])
+
+        if self._plans is None or len(spectrum) != _size:
+            raise ValueError("spectrum size and channel plan mismatch")
+
+        self._buffer = self._xp.asarray(spectrum)
+
+    def share_spectrum(self, buffer):
+        """
+        Write the spectrum of the next blocks into the given buffer.
+
+        load() writes the spectrum into the buffer instead of its own
+        one, e.g. into shared memory read by other processes with
+        load_spectrum(), so the spectrum isn't copied again. The buffer
+        is kept by the new plans of the same spectrum size and dtype.
+
+        Parameters
+        ----------
+        buffer : arr or None
+            buffer with the size and dtype of the spectrum property,
+            None to stop sharing
+        """
+        if buffer is None:
+            if self._shared is not None and self._buffer is self._shared:
+                self._buffer = self._buffer.copy()
+            self._shared = None
+            return
+
+        if self._buffer is None or buffer.shape != self._buffer.shape or \
+                buffer.dtype != self._buffer.dtype:
+            raise ValueError("buffer and spectrum mismatch")
+
+        buffer[...] = self._buffer
+        self._buffer = self._shared = buffer
+
+    def run(self, channel_index: int, out=None):
         """
         Return the channelized signal.
 
+        Only the bins of the channel are read from the input spectrum.
+
         This method should be called after load().
 
         Parameters
         ----------
         channel_index : int
             index of the channel
+        out : arr, optional
+            output buffer with the size of the channel bandwidth, the bins
+            are gathered into it and the inverse FFT overwrites them
+            (default is None, a new array is returned)
         """
-        _channel = self._bounds[int(channel_index)]
-        _roll_factor = int(self._input_frequency - _channel.center_frequency)
-        _resample_factor = int(_channel.bandwidth)
+        _bandwidth, _row = self._rows[int(channel_index)]
+        _bins, _win, _nyq = self._plans[_bandwidth]
+        _out = self._outputs[int(channel_index)]
+
+        if out is not None:
+            _out = self._output(out, _out.shape, _out.dtype)
+
+        self._xp.take(self._buffer, _bins[_row], out=_out)
+        _out *= _win[_row]
+
+        if _nyq is not None:
+            _dst, _src, _weight = _nyq
+            _out[_dst] += self._buffer[int(_src[_row])] * _weight[_row]
+
+        with self._fft_workers():
+            if out is None:
+                return self._fft.ifft(_out)
+            _tmp = self._fft.ifft(_out, **self._overwrite())
+
+        # The FFT might not work in place, like on the GPU.
+        if _tmp is not _out:
+            _out[...] = _tmp
+
+        return _out
+
+    def run_many(self, channel_indices: List[int]) -> List:
+        """
+        Return the channelized signal of multiple channels.
+
+        The bins of channels with the same bandwidth are gathered into a
+        2-D array (channels x samples). The windowing and inverse FFT of
+        each array are processed in a single batched call. The output is
+        the same as calling run() for each channel.
+
+        This method should be called after load().
+
+        Parameters
+        ----------
+        channel_indices : list of int
+            indices of the channels
+
+        Returns
+        -------
+        output : list of arr
+            channelized signals in the same order as channel_indices
+        """
+        _output = [None] * len(channel_indices)
+
+        for _bandwidth, _items in self._batches(channel_indices).items():
+            _bins, _win, _nyq = self._plans[_bandwidth]
+            _rows = [self._rows[_ch][1] for _, _ch in _items]
+
+            # Skip copying the gather plan when all channels are requested.
+            if _rows != list(range(len(_bins))):
+                _bins = _bins[_rows]
+                _win = _win[_rows]
+
+            _tmp = self._buffer[_bins]
+            _tmp *= _win
+
+            if _nyq is not None:
+                _dst, _src, _weight = _nyq
+                _tmp[:, _dst] += self._buffer[_src[_rows]] * _weight[_rows]
+
+            with self._fft_workers():
+                _tmp = self._fft.ifft(_tmp, axis=1, **self._overwrite())
+
+            for _row, (_pos, _) in enumerate(_items):
+                _output[_pos] = _tmp[_row]
+
+        return _output
+
+    def run_all(self) -> List:
+        """
+        Return the channelized signal of every registered channel.
+
+        This method should be called after load().
+
+        Returns
+        -------
+        output : list of arr
+            channelized signals in the same order as channels()
+        """
+        return self.run_many(range(len(self._bounds)))
+
+    def warmup(self, size: Union[int, None] = None):
+        """
+        Prepare the plans in advance of the first load().
+
+        A dummy block of zeros is loaded and channelized. The state of
+        the stream and of the squelch is rewound afterwards, so the plans
+        and buffers are ready without changing the output.
+
+        Parameters
+        ----------
+        size : int, optional
+            number of samples of the dummy block (default is the block size
+            of the tuner)
+        """
+        _dummy = self._dummy() if size is None else \
+            self._xp.zeros(int(size), dtype="complex64")
+        _state = self._save_stream()
+        _squelch = [(_ch.active, _ch.level) for _ch in self._bounds]
 
-        if self._win is None:
-            self._win = self._xs.get_window("hann", int(self._input_bandwidth))
-            self._win = self._fft.fftshift(self._win)
+        self.load(_dummy)
+        self.run_all()
 
-        _tmp = self._xp.roll(self._buffer, _roll_factor)
-        return self._xs.resample(_tmp, _resample_factor,
-                                 window=self._win, domain="freq")
+        self._load_stream(_state)
+        for _ch, (_active, _level) in zip(self._bounds, _squelch):
+            _ch.active, _ch.level = _active, _level
+
+    def _dummy(self):
+        return self._xp.zeros(int(self._input_bandwidth), dtype="complex64")
+
+    def _batches(self, channel_indices: List[int]):
+        _batches = {}
+        for _pos, _ch in enumerate(channel_indices):
+            _bandwidth = int(self._bounds[int(_ch)].bandwidth)
+            _batches.setdefault(_bandwidth, []).append((_pos, int(_ch)))
+        return _batches
+
+    def _bins(self, size: int, bandwidth: int):
+        # Same bin selection as an FFT-domain resample. The input bins
+        # are relative to the channel center. When the bandwidth is even,
+        # both bins at the Nyquist frequency are summed into the output.
+        _half = (bandwidth // 2) + 1
+        _bins = self._np.arange(bandwidth)
+        _bins[_half:] += size - bandwidth
+
+        _nyq = None
+        if (bandwidth % 2) == 0:
+            _nyq = (size - (bandwidth // 2), bandwidth // 2)
+
+        return _bins, _nyq
+
+    def _invalidate(self):
+        # Called whenever the channel layout or input bandwidth changes.
+        self._plans = None
+
+    # Attributes set by a new plan, see _save_plan().
+    _plan_state = ("_zooms", "_split", "_plans", "_rows", "_outputs",
+                   "_probes", "_plan_size", "_plan_workers", "_generation")
+
+    def _save_plan(self):
+        # Plan of the last load(), for a copy of the Tuner that only runs
+        # the channels of a shared spectrum, see _load_plan().
+        return {_name: self.__dict__[_name] for _name in self._plan_state}
+
+    def _load_plan(self, plan):
+        # Replace the plan by the one of _save_plan(). The spectrum should
+        # be loaded again afterwards.
+        self.__dict__.update(plan)
+        self._buffer = None
+
+    def __plan(self, size: int, dtype):
+        # Gather plan of each channel bandwidth. Holds the input bins of
+        # every channel (channels x bandwidth), the pre-shifted window
+        # scaled by the resampling ratio, and the folded Nyquist bins.
+        _win = self._ss.get_window("hann", size)
+        _win = self._np.fft.fftshift(_win)
+
+        _offsets = [int(_ch.center_frequency - self._input_frequency)
+                    for _ch in self._bounds]
+
+        # Spectrum of each channel. Either the full FFT or a zoom cluster.
+        # The zoom bins are weighted by the inverse of the filter response.
+        _sources = [(size, 0, None)] * len(self._bounds)
+        self._zooms = self.__zoom(size, dtype)
+        self._split = None if self._zooms else self.__split(size, dtype)
+
+        if self._zooms:
+            _start = 0
+            self._zooms = []
+            for _members, _center, _span in self.__clusters(size):
+                _taps, _down = self.__zoom_filter(size, _center, _span)
+                _rate = size // _down
+
+                self._zooms.append((self._polyphase_taps(_taps, _down,
+                                                         dtype),
+                                    _down, _rate, _start))
+                for _i in _members:
+                    _sources[_i] = (_rate, _start, _taps)
+                _start += _rate
+
+            self._buffer = self.__shared(_start, dtype)
+            if self._buffer is None:
+                self._buffer = self._xp.zeros(_start, dtype=dtype)
+        else:
+            self.__shared(size, dtype)
+
+        self._plans = {}
+        self._rows = [None] * len(self._bounds)
+        self._outputs = [None] * len(self._bounds)
+
+        _batches = self._batches(range(len(self._bounds)))
+        _probes = {}
+
+        for _bandwidth, _items in _batches.items():
+            _bins, _nyq = self._bins(size, _bandwidth)
+            _scale = _bandwidth / size
+
+            # Bins relative to the input center. Negative below it.
+            _signed = self._np.where(_bins < size // 2, _bins, _bins - size)
+
+            _gather, _window, _src, _weight = [], [], [], []
+            for _, _i in _items:
+                _rate, _start, _taps = _sources[_i]
+                _abs = _signed + _offsets[_i]
+                _gain = _win[_bins] * _scale
+
+                if _taps is not None:
+                    _gain = _gain / self.__response(_taps, _abs, size, _rate)
+
+                _gather.append(self.__index((_abs % _rate) + _start))
+                _window.append(_gain)
+
+                # Bins and power gains sampled along the channel.
+                if self._bounds[_i].squelch is not None:
+                    _pick = self._np.linspace(0, _bandwidth - 1, 1024)
+                    _pick = _pick.astype(int)
+                    _probes[_i] = (_gather[-1][_pick], self._np.abs(
+                        _gain[_pick]) ** 2 / _bandwidth)
+
+                if _nyq is not None:
+                    _abs = (_nyq[0] - size) + _offsets[_i]
+                    _gain = _win[_nyq[0]] * _scale
+                    if _taps is not None:
+                        _gain /= self.__response(_taps, [_abs], size,
+                                                 _rate)[0]
+                    _src.append(self.__index((_abs % _rate) + _start))
+                    _weight.append(_gain)
+
+            # Without zoom, the window is the same for every channel.
+            if self._zooms:
+                _window = self._xp.asarray(self._np.array(_window), dtype)
+            else:
+                _window = self._xp.asarray(_window[0], dtype="float32")
+                _window = self._xp.broadcast_to(_window,
+                                                (len(_items), _bandwidth))
+
+            if _nyq is not None:
+                _nyq = (_nyq[1], self._xp.asarray(self._np.array(_src)),
+                        self._xp.asarray(self._np.array(_weight), dtype))
+
+            _gather = self._xp.asarray(self._np.array(_gather))
+            self._plans[_bandwidth] = (_gather, _window, _nyq)
+
+            for _row, (_, _i) in enumerate(_items):
+                self._rows[_i] = (_bandwidth, _row)
+                self._outputs[_i] = self._xp.empty(_bandwidth, dtype=dtype)
+
+        self._probes = None
+        if _probes:
+            _order = sorted(_probes)
+            self._probes = (
+                [self._bounds[_i] for _i in _order],
+                self._xp.asarray(self._np.array([_probes[_i][0]
+                                                 for _i in _order])),
+                self._xp.asarray(self._np.array([_probes[_i][1]
+                                                 for _i in _order]),
+                                 dtype="float32"))
+
+        self._plan_size = size
+        self._plan_workers = get_fft_workers()
+        self._generation += 1
+
+    def __squelch(self):
+        # Mean output power of each channel with a squelch, estimated
+        # from the sampled bins. Hysteresis of 3 dB.
+        if self._probes is None:
+            return
+
+        _channels, _bins, _gains = self._probes
+        _tmp = self._xp.abs(self._buffer[_bins]) ** 2
+        _tmp = self._xp.mean(_tmp * _gains, axis=1)
+        _tmp = self._xp.asnumpy(_tmp) if self._cuda else _tmp
+
+        for _ch, _power in zip(_channels, _tmp):
+            _ch.level = float(10 * self._np.log10(max(_power, 1e-30)))
+            _threshold = _ch.squelch - (3.0 if _ch.active else 0.0)
+            _ch.active = _ch.level > _threshold
+
+    def __split(self, size: int, dtype):
+        # Factors and twiddles of the four-step FFT. Both of its passes
+        # are batched FFTs, which are split between the FFT workers unlike
+        # a single large FFT. Not worth it with one worker or on the GPU.
+        if self._cuda or get_fft_workers() == 1:
+            return None
+
+        _rows = int(self._np.sqrt(size))
+        while (size % _rows) != 0:
+            _rows -= 1
+
+        if _rows < 64:
+            return None
+
+        _cols = size // _rows
+        _exp = self._np.outer(self._np.arange(_rows), self._np.arange(_cols))
+        _twiddle = self._np.exp(-2j * self._np.pi * (_exp % size) / size)
+
+        return _rows, _cols, self._xp.asarray(_twiddle, dtype=dtype)
+
+    def __fft(self, input_signal, out=None):
+        if self._split is None:
+            if out is None:
+                return self._fft.fft(input_signal)
+            out[...] = self._fft.fft(input_signal)
+            return out
+
+        # Four-step FFT. The output of the second pass is left transposed,
+        # so bin k is at ((k % rows) * cols) + (k // rows), see __index().
+        _rows, _cols, _twiddle = self._split
+        _tmp = self._fft.fft(input_signal.reshape(_rows, _cols), axis=0)
+        _tmp *= _twiddle
+        _tmp = self._fft.fft(_tmp.T, axis=0, **self._overwrite())
+
+        if out is None:
+            return _tmp.T.reshape(-1)
+        out.reshape(_rows, _cols)[...] = _tmp.T
+        return out
+
+    def __shared(self, size: int, dtype):
+        # Shared spectrum buffer, dropped if it doesn't fit the plan.
+        if self._shared is not None and (
+                self._shared.shape != (size,) or
+                self._shared.dtype != self._np.dtype(dtype)):
+            self._shared = None
+        return self._shared
+
+    def __index(self, bins):
+        # Position of the bins in the spectrum buffer.
+        if self._split is None:
+            return bins
+
+        _rows, _cols, _ = self._split
+        return ((bins % _rows) * _cols) + (bins // _rows)
+
+    def __zoom(self, size: int, dtype) -> bool:
+        if self._zoom is not None:
+            return self._zoom
+
+        # Benchmark of both modes, if autotuning is enabled.
+        _layout = tuple((int(_ch.center_frequency - self._input_frequency),
+                         int(_ch.bandwidth)) for _ch in self._bounds)
+        _mode = self._autotune(
+            (size, self._np.dtype(dtype).name, _layout),
+            {"zoom": partial(self.__candidate, size, dtype, True),
+             "full": partial(self.__candidate, size, dtype, False)})
+        if _mode is not None:
+            return _mode == "zoom"
+
+        # Rough cost model in FFT butterfly units. Each cluster costs
+        # about one unit per input sample and block of filter taps.
+        _cost = float(size)
+        for _, _center, _span in self.__clusters(size):
+            _taps, _down = self.__zoom_filter(size, _center, _span)
+            _rate = size // _down
+            _cost += size * (len(_taps) + (2 * _down) - 1) / _down
+            _cost += _rate * self._np.log2(_rate)
+
+        return bool(_cost < size * self._np.log2(size))
+
+    def __candidate(self, size: int, dtype, zoom: bool):
+        # Tuner with the same channels in the given mode, run by the
+        # autotuner.
+        _tuner = Tuner(zoom=zoom, cuda=self._cuda)
+        for _ch in self._bounds:
+            _tuner.add_channel(_ch.center_frequency, _ch.bandwidth, None)
+        _tuner.request_bandwidth(self._input_bandwidth)
+        _dummy = self._xp.zeros(size, dtype=dtype)
+
+        def _run():
+            _tuner.load(_dummy)
+            _tuner.run_all()
+
+        return _run
+
+    def __clusters(self, size: int):
+        # Merge neighboring channels while the cluster spans at most an
+        # eighth of the input, so it can still be decimated by four.
+        _order = sorted(self._bounds, key=lambda _ch: _ch.lower_frequency)
+        _clusters = []
+
+        for _ch in _order:
+            if _clusters:
+                _members, _lower, _higher = _clusters[-1]
+                _span = max(_higher, _ch.higher_frequency) - _lower
+                if _span <= size / 8:
+                    _members.append(_ch.index)
+                    _clusters[-1][2] = max(_higher, _ch.higher_frequency)
+                    continue
+            _clusters.append([[_ch.index], _ch.lower_frequency,
+                              _ch.higher_frequency])
+
+        return [(_members, int((_lower + _higher) / 2 - self._input_frequency),
+                 _higher - _lower) for _members, _lower, _higher in _clusters]
+
+    def __zoom_filter(self, size: int, center: int, span: float):
+        # Output rate is the smallest divisor of the input size that is
+        # at least twice the span. Aliases land outside of the span.
+        _down = max(int(size // (2 * span)), 1)
+        while (size % _down) != 0:
+            _down -= 1
+        _rate = size // _down
+
+        _width = (_rate - span) / (size / 2)
+        _num_taps, _beta = self._ss.kaiserord(60, _width)
+        _taps = self._ss.firwin(_num_taps, _rate / size,
+                                window=("kaiser", _beta))
+        _taps = _taps * self._np.exp(2j * self._np.pi * center *
+                                     self._np.arange(_num_taps) / size)
+
+        return _taps, _down
+
+    def __response(self, taps, bins, size: int, rate: int):
+        # Frequency response of the decimating filter at the given bins.
+        # Includes the gain loss of the decimation.
+        _w = 2 * self._np.pi * self._np.asarray(bins) / size
+        _, _h = self._ss.freqz(taps, worN=_w)
+        return _h * (rate / size)
 
     def __recalculate(self):
         _lower_freq = min([_ch.lower_frequency for _ch in self._bounds])
@@ -172,3 +722,426 @@ class Tuner(Injector):
         _mean_bandwidth //= len(self._bounds)
 
         self._input_bandwidth += (self._input_bandwidth * -1) % _mean_bandwidth
+
+        self._invalidate()
+
+
+class PolyphaseTuner(Tuner):
+    """
+    The PolyphaseTuner class channelizes the input data with a filterbank.
+
+    A 2x oversampled polyphase filterbank (PFB) splits the input into
+    uniformly spaced channels in a single pass. Each registered channel
+    is then picked from its nearest filterbank channel and fine-tuned
+    to its exact center frequency and bandwidth. The cost of the
+    filterbank doesn't grow with the number of registered channels.
+
+    The filter state is carried between calls of load(). The
+    operation of this class assumes that the input signal is
+    arranged in one second chunks.
+
+    Parameters
+    ----------
+    taps_per_branch : int
+        number of prototype filter taps per polyphase branch (default is 16)
+    window : str
+        window of the prototype filter (default is hamming)
+    cuda : bool
+        use the GPU for processing (default is False)
+    """
+
+    _stream = ("_history",)
+    _measures_squelch = False
+
+    def __init__(self,
+                 taps_per_branch: int = 16,
+                 window: str = "hamming",
+                 cuda: bool = False):
+        """Initialize the PolyphaseTuner class."""
+        self._taps_per_branch: int = int(taps_per_branch)
+        self._window: str = window
+
+        self._size: int = 0
+        self._num_branches: int = 0
+        self._taps = None
+        self._history = None
+        self._picks = None
+
+        super().__init__(cuda=cuda)
+
+        # Overlap-add is faster for short filters but missing in cuSignal.
+        if self._cuda:
+            self._conv = self._xs.fftconvolve
+        else:
+            self._conv = self._xs.oaconvolve
+
+    @property
+    def num_branches(self) -> int:
+        """Return the number of filterbank channels. Zero if not planned."""
+        return self._num_branches
+
+    def load(self, input_signal):
+        """
+        Channelize the input data with the filterbank.
+
+        This method should be called in advance of run().
+
+        Parameters
+        ----------
+        input_signal : arr
+            input signal buffer with one second worth of samples
+        """
+        _tmp = self._xp.asarray(input_signal)
+
+        if len(_tmp) != self._size:
+            self.__plan(len(_tmp))
+
+        _ext = self._xp.concatenate((self._history, _tmp))
+        self._history = _ext[len(_ext) - len(self._history):].copy()
+
+        # Polyphase partition. Each branch is a FIR along the rows of the
+        # input arranged in blocks of half the number of branches.
+        _blocks = _ext.reshape(-1, self._num_branches // 2)
+        with self._fft_workers():
+            _lo = self._conv(_blocks[:-1], self._taps[0], mode="valid",
+                             axes=0)
+            _hi = self._conv(_blocks[1:], self._taps[1], mode="valid",
+                             axes=0)
+            _tmp = self._xp.concatenate((_lo, _hi), axis=1)
+
+            self._buffer = self._fft.fft(_tmp, axis=1)
+
+    def run(self, channel_index: int, out=None):
+        """
+        Return the channelized signal.
+
+        This method should be called after load().
+
+        Parameters
+        ----------
+        channel_index : int
+            index of the channel
+        out : arr, optional
+            output buffer with the size of the channel bandwidth
+        """
+        return self._into(out, self.run_many([channel_index])[0])
+
+    def run_many(self, channel_indices: List[int]) -> List:
+        """
+        Return the channelized signal of multiple channels.
+
+        The filterbank outputs of channels with the same bandwidth are
+        gathered into a 2-D array (channels x samples) and fine-tuned in
+        a single batched call. The output is the same as calling run()
+        for each channel.
+
+        This method should be called after load().
+
+        Parameters
+        ----------
+        channel_indices : list of int
+            indices of the channels
+
+        Returns
+        -------
+        output : list of arr
+            channelized signals in the same order as channel_indices
+        """
+        _size = self._buffer.shape[0]
+        _output = [None] * len(channel_indices)
+
+        for _bandwidth, _items in self._batches(channel_indices).items():
+            _picks = [self._picks[_ch] for _, _ch in _items]
+            _branches = [_branch for _branch, _, _ in _picks]
+            _phases = self._xp.stack([self._xp.broadcast_to(_phase, (_size,))
+                                      for _, _, _phase in _picks])
+
+            _tmp = self._buffer[:, _branches].T * _phases
+            with self._fft_workers():
+                _tmp = self._fft.fft(_tmp, axis=1)
+
+            _bins, _nyq = self._bins(_size, _bandwidth)
+            _bins = self._xp.asarray(_bins)
+            _shifts = [_res for _, _res, _ in _picks]
+            _shifts = self._xp.asarray(_shifts)[:, None]
+            _rows = self._xp.arange(len(_items))[:, None]
+
+            _out = _tmp[_rows, (_bins + _shifts) % _size]
+
+            if _nyq is not None:
+                _src = _tmp[_rows[:, 0], (_nyq[0] + _shifts[:, 0]) % _size]
+                _out[:, _nyq[1]] += _src
+
+            _out *= _bandwidth / _size
+            with self._fft_workers():
+                _out = self._fft.ifft(_out, axis=1)
+
+            for _row, (_pos, _) in enumerate(_items):
+                _output[_pos] = _out[_row]
+
+        return _output
+
+    def _invalidate(self):
+        super()._invalidate()
+        self._size = 0
+        self._history = None
+
+    def __plan(self, size: int):
+        _bandwidth = max([_ch.bandwidth for _ch in self._bounds])
+
+        # Pick the finest channel spacing that still fits any channel inside
+        # the flat passband of a filterbank channel once it's off-centered.
+        _m = int(self._input_bandwidth // (_bandwidth / 0.6))
+        _m -= _m % 2
+        while _m > 2 and (size % (_m // 2)) != 0:
+            _m -= 2
+
+        if _m < 2 or (size % (_m // 2)) != 0:
+            raise ValueError(f"cannot plan filterbank for input size ({size}) "
+                             f"and channel bandwidth ({_bandwidth})")
+
+        _d = _m // 2
+        _p = self._taps_per_branch
+        _spacing = self._input_bandwidth / _m
+
+        # Reversed prototype filter interleaved with zeros for both halves.
+        _h = self._ss.firwin(_m * _p, 2.0 / _m, window=self._window)
+        _h = self._np.reshape(_h, (_p, _m))[:, ::-1]
+        _g = self._np.zeros((2 * _p - 1, _m), dtype="float32")
+        _g[::2] = _h
+        self._taps = (self._xp.array(_g[:, :_d]), self._xp.array(_g[:, _d:]))
+
+        # Phase correction of a 2x oversampled filterbank is (-1)^(k*n).
+        _rows = size // _d
+        _signs = self._np.where(self._np.arange(_rows) % 2, -1.0, 1.0)
+
+        self._picks = []
+        for _ch in self._bounds:
+            _offset = _ch.center_frequency - self._input_frequency
+            _k = int(round(_offset / _spacing))
+            _residual = int(_offset - (_k * _spacing))
+            _k %= _m
+
+            _phase = self._np.exp(-2j * self._np.pi * _k / _m)
+            _phase = _phase * (_signs if (_k % 2) else 1.0)
+            _phase = self._xp.asarray(_phase, dtype="complex64")
+            self._picks.append((_k, _residual, _phase))
+
+        self._num_branches = _m
+        self._history = self._xp.zeros(_m * _p - _d, dtype="complex64")
+        self._size = size
+
+
+class StreamingTuner(Tuner):
+    """
+    The StreamingTuner class channelizes a stream of input data blocks.
+
+    Unlike the Tuner, the input data doesn't have to be arranged in one
+    second chunks. Every call of load() takes a block of block_size
+    samples. The channels are extracted with an overlap-save fast
+    convolution. The overlap is carried between calls, so the output
+    is continuous across block boundaries.
+
+    The block and overlap sizes should hold an integer number of output
+    samples of every channel (size * bandwidth / input_bandwidth).
+
+    Parameters
+    ----------
+    block_size : int, float
+        number of input samples of each block
+    overlap : int, float, optional
+        number of samples overlapped between blocks (default is block_size)
+    window : str, tuple
+        frequency response of the channel filter (default is tukey, 0.2)
+    cuda : bool
+        use the GPU for processing (default is False)
+    """
+
+    _stream = ("_history", "_offset", "_next_phases")
+    _measures_squelch = False
+
+    def __init__(self,
+                 block_size: Union[int, float],
+                 overlap: Union[int, float, None] = None,
+                 window=("tukey", 0.2),
+                 cuda: bool = False):
+        """Initialize the StreamingTuner class."""
+        self._block_size: int = int(block_size)
+        self._overlap: int = int(overlap or block_size)
+        self._fft_size: int = self._block_size + self._overlap
+        self._window = window
+
+        self._planned: bool = False
+        self._history = None
+        self._filters = None
+        self._mixers = None
+        self._offset: int = 0
+        self._next_phases = None
+
+        super().__init__(cuda=cuda)
+
+    @property
+    def block_size(self) -> int:
+        """Return the number of input samples of each block."""
+        return self._block_size
+
+    def output_size(self, channel_index: int) -> int:
+        """
+        Return the number of output samples of a channel for each block.
+
+        Parameters
+        ----------
+        channel_index : int
+            index of the channel
+        """
+        _channel = self._bounds[int(channel_index)]
+        return self.__scale(self._block_size, _channel.bandwidth)
+
+    def load(self, input_signal):
+        """
+        Pre-process the input data block.
+
+        This method should be called in advance of run().
+
+        Parameters
+        ----------
+        input_signal : arr
+            input signal buffer with block_size samples
+        """
+        if len(input_signal) != self._block_size:
+            raise ValueError("input_signal size and block_size mismatch")
+
+        if not self._planned:
+            self.__plan()
+
+        _tmp = self._xp.asarray(input_signal)
+        _tmp = self._xp.concatenate((self._history, _tmp))
+        self._history = _tmp[self._block_size:]
+        with self._fft_workers():
+            self._buffer = self._fft.fft(_tmp)
+
+        # Start of the FFT frame in samples modulo FFT size and
+        # phase of the residual mixers at the start of this block.
+        self._frame = self._offset
+        self._offset = (self._offset + self._block_size) % self._fft_size
+        self._phases = self._next_phases
+        self._next_phases = (self._phases + self._steps) % (2 * self._np.pi)
+
+    def run(self, channel_index: int, out=None):
+        """
+        Return the channelized signal of the last block.
+
+        This method should be called after load().
+
+        Parameters
+        ----------
+        channel_index : int
+            index of the channel
+        out : arr, optional
+            output buffer with the size of the channel bandwidth
+        """
+        return self._into(out, self.run_many([channel_index])[0])
+
+    def run_many(self, channel_indices: List[int]) -> List:
+        """
+        Return the channelized signal of multiple channels.
+
+        The bins of channels with the same bandwidth are gathered into a
+        2-D array (channels x samples) and processed in a single batched
+        inverse FFT call.
+
+        This method should be called after load().
+
+        Parameters
+        ----------
+        channel_indices : list of int
+            indices of the channels
+
+        Returns
+        -------
+        output : list of arr
+            channelized signals in the same order as channel_indices
+        """
+        _output = [None] * len(channel_indices)
+
+        for _bandwidth, _items in self._batches(channel_indices).items():
+            _mixers = [self._mixers[_ch] for _, _ch in _items]
+            _bins, _win, _keep = self._filters[_bandwidth]
+
+            _centers = self._xp.asarray([_p[0] for _p in _mixers])[:, None]
+            _tmp = self._buffer[(_bins + _centers) % self._fft_size] * _win
+            with self._fft_workers():
+                _tmp = self._fft.ifft(_tmp, axis=1)[:, _keep]
+
+            for _row, (_pos, _ch) in enumerate(_items):
+                _center, _nco = self._mixers[_ch]
+
+                # Rotate the frame phase back to a continuous mixer.
+                _phase = ((_center * self._frame) % self._fft_size)
+                _phase = -2 * self._np.pi * _phase / self._fft_size
+                _phase = self._np.exp(1j * (_phase + self._phases[_ch]))
+                _output[_pos] = _tmp[_row] * (_nco * _phase)
+
+        return _output
+
+    def _dummy(self):
+        return self._xp.zeros(self._block_size, dtype="complex64")
+
+    def _invalidate(self):
+        super()._invalidate()
+        self._planned = False
+        self._history = None
+        self._next_phases = None
+
+    def __scale(self, size: int, bandwidth: float) -> int:
+        _size = (size * bandwidth) / self._input_bandwidth
+        if _size != int(_size):
+            raise ValueError(f"block size ({size}) doesn't hold an integer "
+                             f"number of samples of a {bandwidth} channel")
+        return int(_size)
+
+    def __plan(self):
+        _fs = self._input_bandwidth
+
+        self._filters = {}
+        for _ch in self._bounds:
+            _bandwidth = int(_ch.bandwidth)
+            if _bandwidth in self._filters:
+                continue
+
+            _size = self.__scale(self._fft_size, _bandwidth)
+            _bins, _ = self._bins(self._fft_size, _size)
+
+            # The Nyquist bin is zeroed by the window. No need to fold it.
+            _win = self._xs.get_window(self._window, _size)
+            _win = self._fft.fftshift(_win) * (_size / self._fft_size)
+
+            # The channel filter is zero-phase. Its impulse response wraps
+            # around both edges of the frame, so keep the samples centered
+            # in the frame. This delays the output by half of the overlap.
+            _start = self.__scale(self._overlap, _bandwidth) // 2
+            _stop = _start + self.__scale(self._block_size, _bandwidth)
+            self._filters[_bandwidth] = (self._xp.asarray(_bins), _win,
+                                         slice(_start, _stop))
+
+        # Channels are centered on the nearest bin. The residual offset is
+        # removed by a mixer at the output rate that runs across blocks.
+        self._mixers = []
+        self._steps = self._np.zeros(len(self._bounds))
+        for _ch in self._bounds:
+            _offset = _ch.center_frequency - self._input_frequency
+            _center = int(round(_offset * self._fft_size / _fs))
+            _residual = _offset - (_center * _fs / self._fft_size)
+
+            _n = self.__scale(self._block_size, _ch.bandwidth)
+            _t = self._np.arange(_n) / _ch.bandwidth
+            _nco = self._np.exp(-2j * self._np.pi * _residual * _t)
+            self._mixers.append((_center % self._fft_size,
+                                self._xp.asarray(_nco, dtype="complex64")))
+            self._steps[_ch.index] = -2 * self._np.pi * _residual * _n
+            self._steps[_ch.index] /= _ch.bandwidth
+
+        self._history = self._xp.zeros(self._overlap, dtype="complex64")
+        self._next_phases = self._np.zeros(len(self._bounds))
+        self._offset = 0
+        self._planned = True
@@ -0,0 +1,215 @@
+"""Defines a frequency translating FIR Tuner module."""
+
+from fractions import Fraction
+from typing import List
+
+from radiocore.tools.tuner import Tuner
+
+
+class XlatingTuner(Tuner):
+    """
+    The XlatingTuner class extracts channels with FIR filters.
+
+    Each channel is translated and decimated by a chain of polyphase
+    FIR filters. The first stage is a bandpass filter centered on the
+    channel that decimates by an integer factor. A phase-continuous
+    NCO then moves the channel to baseband, where a rational polyphase
+    resampler outputs the channel bandwidth rate. The filter and NCO
+    states are carried between blocks, so the output is continuous.
+
+    The cost scales with the output rate and number of filter taps of
+    each channel. It's a good fit for one or two narrow channels. For
+    many channels, use the Tuner class.
+
+    Blocks can have any size, as long as it holds an integer number of
+    output samples of every channel. Changing the block size between
+    calls resets the filter states. There's no configured block size, so
+    warmup() takes the size of the blocks or uses the last one loaded.
+
+    Parameters
+    ----------
+    transition : float
+        transition width as fraction of the channel bandwidth
+        (default is 0.2)
+    attenuation : float
+        stopband attenuation in dB (default is 60)
+    cuda : bool
+        use the GPU for processing (default is False)
+    """
+
+    _stream = ("_states",)
+    _measures_squelch = False
+
+    def __init__(self,
+                 transition: float = 0.2,
+                 attenuation: float = 60.0,
+                 cuda: bool = False):
+        """Initialize the XlatingTuner class."""
+        self._transition: float = float(transition)
+        self._attenuation: float = float(attenuation)
+        self._size: int = 0
+        self._stages = None
+        self._states = None
+        self._results = None
+
+        super().__init__(cuda=cuda)
+
+    def load(self, input_signal):
+        """
+        Load the input data block.
+
+        This method should be called in advance of run().
+
+        Parameters
+        ----------
+        input_signal : arr
+            input signal buffer
+        """
+        self._buffer = self._xp.asarray(input_signal)
+
+        if self._stages is None or len(self._buffer) != self._size:
+            self.__plan(len(self._buffer))
+        self._results = [None] * len(self._bounds)
+
+    def run(self, channel_index: int, out=None):
+        """
+        Return the channelized signal of the last block.
+
+        The filters of a channel run once per block. Repeated calls with
+        the same channel_index return the same array.
+
+        This method should be called after load().
+
+        Parameters
+        ----------
+        channel_index : int
+            index of the channel
+        out : arr, optional
+            output buffer with the size of the channel bandwidth, the
+            result is copied into it
+        """
+        _index = int(channel_index)
+
+        if self._results[_index] is None:
+            self._results[_index] = self.__filter(self._stages[_index],
+                                                  self._states[_index])
+
+        return self._into(out, self._results[_index])
+
+    def run_many(self, channel_indices: List[int]) -> List:
+        """
+        Return the channelized signal of multiple channels.
+
+        This method should be called after load().
+
+        Parameters
+        ----------
+        channel_indices : list of int
+            indices of the channels
+
+        Returns
+        -------
+        output : list of arr
+            channelized signals in the same order as channel_indices
+        """
+        return [self.run(_ch) for _ch in channel_indices]
+
+    def _dummy(self):
+        if not self._size:
+            raise ValueError("block size is unknown, pass the size to "
+                             "warmup()")
+        return self._xp.zeros(self._size, dtype="complex64")
+
+    def _invalidate(self):
+        super()._invalidate()
+        self._stages = None
+        self._states = None
+
+    def __filter(self, stage, state):
+        _taps, _down, _nco, _up, _dn, _lowpass = stage
+
+        # Bandpass and integer decimation as a matrix product.
+        _tmp = self._xp.concatenate((state[0], self._buffer))
+        state[0] = _tmp[len(_tmp) - len(state[0]):].copy()
+        _size = len(self._buffer) // _down
+        _tmp = self._polyphase_filter(_tmp, _taps, _size)
+
+        # Phase-continuous NCO to baseband.
+        _phase = state[1] + (_nco * self._xp.arange(_size))
+        _tmp *= self._xp.exp(1j * _phase).astype(_tmp.dtype)
+        state[1] = float((state[1] + (_nco * _size)) % (2 * self._np.pi))
+
+        if _lowpass is None:
+            return _tmp
+
+        # Rational resampling. The history is a multiple of the down
+        # factor, so the output grid stays aligned between blocks.
+        _hist = len(state[2])
+        _tmp = self._xp.concatenate((state[2], _tmp))
+        state[2] = _tmp[len(_tmp) - _hist:].copy()
+        _tmp = self._xs.upfirdn(_lowpass, _tmp, up=_up, down=_dn)
+
+        _start = (_hist * _up) // _dn
+        return _tmp[_start:_start + ((_size * _up) // _dn)]
+
+    def __plan(self, size: int):
+        _fs = self._input_bandwidth
+        self._stages = []
+        self._states = []
+
+        for _ch in self._bounds:
+            _bw = _ch.bandwidth
+            _offset = _ch.center_frequency - self._input_frequency
+
+            if ((size * _bw) % _fs) != 0:
+                raise ValueError(f"input_signal size ({size}) doesn't hold "
+                                 "an integer number of samples of a "
+                                 f"{_bw} channel")
+
+            # First stage decimates to at least twice the channel bandwidth
+            # by a factor of the block size. Aliases land outside of the
+            # channel.
+            _down = max(int(_fs // (2 * _bw)), 1)
+            while (size % _down) != 0:
+                _down -= 1
+            _rate = _fs / _down
+            _width = min((_rate - _bw) / (_fs / 2), 1.0)
+            _num, _beta = self._ss.kaiserord(self._attenuation, _width)
+            _taps = self._ss.firwin(_num, _rate / _fs,
+                                    window=("kaiser", _beta))
+            _taps = _taps * self._np.exp(2j * self._np.pi * _offset *
+                                         self._np.arange(_num) / _fs)
+
+            _matrix = self._polyphase_taps(_taps, _down, "complex64")
+
+            # Residual offset of the channel after the decimation.
+            _alias = ((_offset + (_rate / 2)) % _rate) - (_rate / 2)
+            _nco = -2 * self._np.pi * _alias / _rate
+
+            # Filter history, NCO phase and resampler history.
+            _history = self._xp.zeros((_matrix.shape[1] - 1) * _down,
+                                      dtype="complex64")
+            _state = [_history, 0.0, None]
+
+            _ratio = Fraction(int(_bw)) / Fraction(int(_fs), _down)
+            _up, _dn = _ratio.numerator, _ratio.denominator
+            _lowpass = None
+
+            if _ratio != 1:
+                # Second stage at the upsampled rate. Cutoff at the channel
+                # edge with the transition centered on it.
+                _fu = _rate * _up
+                _width = (self._transition * _bw) / (_fu / 2)
+                _num, _beta = self._ss.kaiserord(self._attenuation, _width)
+                _lowpass = self._ss.firwin(_num, _bw / _fu,
+                                           window=("kaiser", _beta)) * _up
+                _lowpass = self._xp.asarray(_lowpass, dtype="float32")
+
+                _hist = -(-(_num - 1) // (_up * _dn)) * _dn
+                _state[2] = self._xp.zeros(_hist, dtype="complex64")
+
+            self._stages.append((_matrix, _down, _nco,
+                                 _up, _dn, _lowpass))
+            self._states.append(_state)
+
+        self._size = size
@@ -1,7 +1,7 @@
 import numpy as np
 from timeit import timeit
 
-from radiocore import WBFM, MFM, FM, Decimate, Buffer, Tuner, RingBuffer, HasCuda
+from radiocore import WBFM, MFM, FM, Decimate, Buffer, Tuner, PolyphaseTuner, XlatingTuner, RingBuffer, HasCuda
 import warnings
 
 N_ITER = 50
@@ -54,13 +54,13 @@ class DecimateBenchmark:
 
 class TunerBenchmark:
 
-    def __init__(self, input_size, channel_size, cuda):
+    def __init__(self, input_size, channel_size, cuda, tuner=Tuner):
         self.input_size = int(input_size)
         self.channel_size = int(channel_size)
         self.cuda = cuda
         self.iterations = N_ITER
 
-        self.tuner = Tuner(cuda=self.cuda)
+        self.tuner = tuner(cuda=self.cuda)
         self.tuner.add_channel(94.5e6, self.channel_size, FM)
         self.tuner.add_channel(97.5e6, self.channel_size, FM)
         self.tuner.add_channel(96.9e6, self.channel_size, FM)
@@ -75,7 +75,10 @@ class TunerBenchmark:
     def test(self):
         print('#### Tuner Benchmark (Input size: {}, Channel size: {}, CUDA: {}):'
               .format(self.input_size, self.channel_size, self.cuda))
-        self.eval('self.tuner.load(self.buff.data);self.tuner.run(0);', 'Tuner')
+        self.eval('self.tuner.load(self.buff.data);self.tuner.run(0);',
+                  type(self.tuner).__name__)
+        self.eval('self.tuner.load(self.buff.data);self.tuner.run_all();',
+                  type(self.tuner).__name__ + ' (run_all)')
 
 
 if __name__ == '__main__':
@@ -103,8 +106,12 @@ if __name__ == '__main__':
 
     # Benchmark Tuner.
     TunerBenchmark(10e6, 250e3, False).test()
+    TunerBenchmark(10e6, 250e3, False, PolyphaseTuner).test()
+    TunerBenchmark(10e6, 250e3, False, XlatingTuner).test()
 
     if HasCuda():
         TunerBenchmark(10e6, 250e3, True).test()
+        TunerBenchmark(10e6, 250e3, True, PolyphaseTuner).test()
+        TunerBenchmark(10e6, 250e3, True, XlatingTuner).test()
 
     print("=" * 80)
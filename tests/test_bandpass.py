@@ -0,0 +1,27 @@
+"""Bandpass test."""
+
+import numpy as np
+from scipy import signal
+
+from radiocore import Bandpass
+
+
+def test_streaming_bandpass():
+    """Test streaming bandpass function."""
+    _sig = np.random.randn(48000).astype(np.float32)
+
+    bandpass = Bandpass(24e3, 1e3, 5e3, num_taps=41, streaming=True)
+    assert bandpass.delay == 20
+
+    # Blocks of any size match a single pass of the causal filter.
+    _out = [bandpass.run(_part) for _part in np.split(_sig, [100, 24000])]
+    _taps = signal.firwin(41, [1e3 / 12e3, 5e3 / 12e3], pass_zero=False,
+                          window="hamm")
+    _expected = signal.lfilter(_taps, 1.0, _sig)
+    assert np.allclose(np.concatenate(_out), _expected, atol=1e-5)
+
+    # A tone in the passband is delayed by the group delay.
+    _tone = np.cos(2 * np.pi * 3e3 * np.arange(24000) / 24e3)
+    bandpass = Bandpass(24e3, 1e3, 5e3, num_taps=41, streaming=True)
+    _out = bandpass.run(_tone.astype(np.float32))
+    assert np.allclose(_out[1000:], _tone[980:-20], atol=1e-2)
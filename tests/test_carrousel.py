@@ -1,5 +1,7 @@
 """Carrousel test."""
 
+import pytest
+
 from radiocore import Carrousel
 
 
@@ -72,3 +74,36 @@ def test_carrousel():
     assert carsl.capacity == 3
     assert not carsl.is_full
     assert carsl.is_empty
+
+
+def test_carrousel_overflow():
+    """Test carrousel overflow policies."""
+    carsl = Carrousel([[0], [0]], overflow="drop_newest")
+    for _value in (1, 2, 3):
+        with carsl.enqueue() as buf:
+            if buf is not None:
+                buf[0] = _value
+
+    assert carsl.overflow == 1
+    assert carsl.dropped == 1
+    assert carsl.high_water == 2
+
+    with carsl.dequeue() as buf:
+        assert buf[0] == 1
+
+    carsl = Carrousel([[0]], overflow="block")
+    with carsl.enqueue() as buf:
+        buf[0] = 1
+
+    # The new item is dropped after the timeout.
+    with carsl.enqueue(timeout=0.01) as buf:
+        assert buf is None
+    assert carsl.overflow == 1
+
+    carsl = Carrousel([[0]], overflow="raise")
+    with carsl.enqueue() as buf:
+        buf[0] = 1
+
+    with pytest.raises(ValueError):
+        with carsl.enqueue():
+            pass
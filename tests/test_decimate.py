@@ -0,0 +1,60 @@
+"""Decimate test."""
+
+import numpy as np
+
+from radiocore import Decimate
+
+
+def test_streaming_decimate():
+    """Test streaming decimate function."""
+    _t = np.arange(2 * 240000) / 240000
+    _sig = np.cos(2 * np.pi * 5e3 * _t).astype(np.float32)
+
+    decimate = Decimate(240e3, 48e3, streaming=True)
+    _out = np.concatenate([decimate.run(_sig[:240000]),
+                           decimate.run(_sig[240000:])])
+    assert len(_out) == 96000
+    assert np.isclose(np.abs(_out[48000:]).max(), 1.0, atol=1e-2)
+
+    # Blocks of any size output the same samples.
+    decimate = Decimate(240e3, 48e3, streaming=True)
+    _parts = np.split(_sig, [1, 1001, 7777, 300000])
+    _split = np.concatenate([decimate.run(_part) for _part in _parts])
+    assert np.allclose(_split, _out, atol=1e-5)
+
+    # Rational ratio and stereo input along the last axis.
+    decimate = Decimate(240e3, 44.1e3, streaming=True)
+    assert decimate.num_stages == 2
+    _out = decimate.run(np.stack((_sig, -_sig)))
+    assert _out.shape == (2, 88200)
+    assert np.allclose(_out[0], -_out[1])
+
+
+def test_output_buffers():
+    """Test out buffers of the streaming cascade."""
+    _sig = np.random.randn(2, 250000).astype(np.float32)
+
+    for _input_size, _stages in ((240e3, 1), (250e3, 2)):
+        decimate = Decimate(_input_size, 48e3, streaming=True)
+        reference = Decimate(_input_size, 48e3, streaming=True)
+        assert decimate.num_stages == _stages
+        _out = np.empty(48000, dtype=np.float32)
+
+        for _block in _sig:
+            _block = _block[:int(_input_size)]
+            assert decimate.run(_block, out=_out) is _out
+            assert np.allclose(_out, reference.run(_block), atol=1e-5)
+
+
+def test_batched_stereo():
+    """Test stereo rows against one filter per channel."""
+    _sig = np.random.randn(2, 2, 240000).astype(np.float32)
+
+    for _streaming in (False, True):
+        decimate = Decimate(240e3, 48e3, streaming=_streaming)
+        left = Decimate(240e3, 48e3, streaming=_streaming)
+        right = Decimate(240e3, 48e3, streaming=_streaming)
+        for _block in _sig:
+            _out = decimate.run(_block)
+            assert np.allclose(_out[0], left.run(_block[0]), atol=1e-5)
+            assert np.allclose(_out[1], right.run(_block[1]), atol=1e-5)
@@ -0,0 +1,53 @@
+"""Deemphasis test."""
+
+import json
+
+import numpy as np
+
+from radiocore import Deemphasis, use_autotune, disable_autotune
+
+
+def test_batched_stereo():
+    """Test stereo rows against one filter per channel."""
+    _sig = np.random.randn(2, 2, 240000).astype(np.float32)
+
+    deemphasis = Deemphasis(240e3)
+    left, right = Deemphasis(240e3), Deemphasis(240e3)
+    for _block in _sig:
+        _out = deemphasis.run(_block)
+        assert np.allclose(_out[0], left.run(_block[0]), atol=1e-5)
+        assert np.allclose(_out[1], right.run(_block[1]), atol=1e-5)
+
+
+def test_deemphasis_methods():
+    """Test IIR and FIR deemphasis realizations."""
+    _sig = np.random.randn(3, 48000).astype(np.float32)
+
+    iir = Deemphasis(48e3)
+    fir = Deemphasis(48e3, method="fir")
+    assert iir.method == "iir" and fir.method == "fir"
+
+    for _block in _sig:
+        assert np.allclose(iir.run(_block), fir.run(_block), atol=1e-5)
+
+
+def test_autotune(tmp_path):
+    """Test autotune function."""
+    _cache = tmp_path / "autotune.json"
+    use_autotune(str(_cache), repeat=1)
+
+    try:
+        assert Deemphasis(48e3).method in ("iir", "fir")
+        assert Deemphasis(48e3, method="fir").method == "fir"
+
+        _results = json.loads(_cache.read_text())
+        assert len(_results) == 1
+
+        # Next constructions read the choices from the cache file.
+        _cache.write_text(json.dumps({_key: "fir" for _key in _results}))
+        use_autotune(str(_cache))
+        assert Deemphasis(48e3).method == "fir"
+    finally:
+        disable_autotune()
+
+    assert Deemphasis(48e3).method == "iir"
@@ -0,0 +1,92 @@
+"""Dispatcher test."""
+
+import numpy as np
+
+from radiocore import Dispatcher, Tuner, FM, MFM, fft_workers
+
+
+def test_dispatcher():
+    """Test dispatcher function."""
+    tuner = Tuner()
+    tuner.add_channel(100.1e6, 50e3, FM(50e3, 10e3))
+    tuner.add_channel(100.37e6, 40e3, FM(40e3, 10e3))
+    tuner.add_channel(99.8e6, 50e3, None)
+    tuner.request_bandwidth(1e6)
+
+    _sig = np.random.randn(int(1e6)).astype(np.complex64)
+    tuner.load(_sig)
+
+    _expected = [FM(50e3, 10e3).run(tuner.run(0)),
+                 FM(40e3, 10e3).run(tuner.run(1)),
+                 tuner.run(2).copy()]
+
+    with Dispatcher(tuner, workers=2) as dispatcher:
+        assert dispatcher.workers == 2
+
+        for _ in range(2):
+            _outputs = dispatcher.run()
+            assert len(_outputs) == 3
+            for _out, _exp in zip(_outputs, _expected):
+                assert np.allclose(_out, _exp)
+
+
+def test_process_dispatcher():
+    """Test dispatcher function with worker processes."""
+    tuner = Tuner()
+    tuner.add_channel(100.1e6, 50e3, MFM(50e3, 10e3))
+    tuner.add_channel(100.37e6, 40e3, FM(40e3, 10e3))
+    tuner.add_channel(99.8e6, 50e3, None)
+    tuner.request_bandwidth(1e6)
+
+    _demods = [MFM(50e3, 10e3), FM(40e3, 10e3)]
+
+    with Dispatcher(tuner, workers=2, processes=True) as dispatcher:
+        for _ in range(2):
+            tuner.load(np.random.randn(int(1e6)).astype(np.complex64))
+            _expected = [_demods[0].run(tuner.run(0)),
+                         _demods[1].run(tuner.run(1)),
+                         tuner.run(2).copy()]
+
+            _outputs = dispatcher.run()
+            assert len(_outputs) == 3
+            for _out, _exp in zip(_outputs, _expected):
+                assert np.allclose(_out, _exp)
+
+        # A new plan of the same size, the four-step FFT reorders the
+        # spectrum, is sent to the workers.
+        with fft_workers(4):
+            tuner.load(np.random.randn(int(1e6)).astype(np.complex64))
+            _outputs = dispatcher.run()
+        assert np.allclose(_outputs[2], tuner.run(2))
+
+
+def test_squelch():
+    """Test squelch of the channels."""
+    tuner = Tuner()
+    tuner.add_channel(100.1e6, 50e3, FM(50e3, 10e3), squelch=-20.0)
+    tuner.add_channel(100.37e6, 40e3, FM(40e3, 10e3), squelch=-5.0)
+    tuner.add_channel(99.8e6, 50e3, None)
+    tuner.request_bandwidth(1e6)
+
+    # White noise of unit power, about -13 dBFS in a 50 kHz channel.
+    _rng = np.random.default_rng(0)
+    _sig = _rng.standard_normal(int(1e6)) + \
+        (1j * _rng.standard_normal(int(1e6)))
+    _sig = (_sig / np.sqrt(2)).astype(np.complex64)
+
+    tuner.load(_sig)
+    assert abs(tuner.channels()[0].level + 13.0) < 0.5
+    assert [_ch.active for _ch in tuner.channels()] == [True, False, True]
+    assert tuner.channels()[2].level is None
+
+    for _processes in (False, True):
+        with Dispatcher(tuner, workers=2, processes=_processes) as _disp:
+            _outputs = _disp.run()
+            assert _outputs[1] is None
+            assert _outputs[0] is not None and _outputs[2] is not None
+
+    # Hysteresis of 3 dB before closing.
+    tuner.load(_sig * 0.35)
+    assert tuner.channels()[0].active
+    tuner.load(np.zeros(int(1e6), dtype=np.complex64))
+    assert not tuner.channels()[0].active
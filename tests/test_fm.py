@@ -0,0 +1,35 @@
+"""FM test."""
+
+import numpy as np
+
+from radiocore import FM, Decimate
+
+
+def test_streaming_fm():
+    """Test streaming fm function."""
+    _size = 50000
+    _t = np.arange(2 * _size) / _size
+    _sig = np.exp(2j * np.pi * 2e3 * np.sin(2 * np.pi * 15 * _t) / 15)
+    _sig = _sig.astype(np.complex64)
+
+    # Phase delta of the whole signal, split in blocks afterwards.
+    _delta = np.angle(_sig[1:] * np.conj(_sig[:-1])) / np.pi
+    _delta = np.concatenate(([0.0], _delta)).astype(np.float32)
+    _decimate = Decimate(_size, 10e3, streaming=True)
+    _resample = Decimate(_size, 10e3)
+
+    demod = FM(_size, 10e3, streaming=True)
+    block = FM(_size, 10e3)
+
+    for _i in range(2):
+        _block = _sig[_i * _size:(_i + 1) * _size]
+        _expected = _decimate.run(_delta[_i * _size:(_i + 1) * _size])
+
+        _out = demod.run(_block)
+        assert _out.shape == (10e3, 1)
+        assert np.allclose(_out[:, 0], _expected, atol=1e-5)
+
+        # Without streaming, the first phase delta of a block is lost.
+        _expected = _resample.run(_delta[_i * _size:(_i + 1) * _size])
+        _out = block.run(_block)
+        assert np.allclose(_out[:, 0], _expected, atol=1e-5) == (_i == 0)
@@ -0,0 +1,41 @@
+"""MFM test."""
+
+import numpy as np
+
+from radiocore import MFM, Tuner
+
+
+def test_output_buffers():
+    """Test out buffers."""
+    _sig = np.exp(1j * np.cumsum(np.random.randn(240000) * 0.3))
+    _sig = _sig.astype(np.complex64)
+
+    demod = MFM(240e3, 48e3)
+    _out = np.empty((48000, 1), dtype=np.float32)
+    assert demod.run(_sig, out=_out) is _out
+    assert np.allclose(MFM(240e3, 48e3).run(_sig), _out)
+
+    # Cascades of two stages output into the same buffers.
+    _sig = np.resize(_sig, 250000)
+    demod = MFM(250e3, 48e3, streaming=True)
+
+    for _ in range(2):
+        assert demod.run(_sig, out=_out) is _out
+        assert demod.run(_sig).shape == (48000, 1)
+
+
+def test_warmup():
+    """Test warmup function."""
+    tuner = Tuner()
+    tuner.add_channel(100.1e6, 50e3, MFM(50e3, 10e3))
+    tuner.request_bandwidth(1e6)
+    tuner.warmup()
+
+    _sig = np.random.randn(int(tuner.input_bandwidth)).astype(np.complex64)
+    tuner.load(_sig)
+
+    # The warmup of a stateful block shouldn't change its output.
+    _demod = tuner.channels()[0].demodulator
+    _expected = MFM(50e3, 10e3).run(tuner.run(0))
+    _demod.warmup()
+    assert np.allclose(_demod.run(tuner.run(0)), _expected)
@@ -0,0 +1,31 @@
+"""PLL test."""
+
+import numpy as np
+import pytest
+
+from radiocore import PLL
+
+
+def test_streaming_pll():
+    """Test streaming pll function."""
+    _fs = 240000
+    _t = np.arange(_fs) / _fs
+    _theta = (2 * np.pi * (19e3 + 3) * _t) + 1.2
+    _pilot = (0.1 * np.cos(_theta)).astype(np.float32)
+
+    # Blocks of any size, the phase is tracked across them.
+    pll = PLL(frequency=19e3, sample_rate=_fs, streaming=True)
+    _cos, _sin = [], []
+    for _part in np.split(_pilot, [12345, 60000, 180001]):
+        pll.step(_part)
+        _cos.append(pll.real())
+        _sin.append(pll.image(2))
+
+    # Locked after the first 200 ms, doubled phase matches the pilot.
+    assert np.allclose(np.concatenate(_cos)[48000:], np.cos(_theta)[48000:],
+                       atol=2e-2)
+    assert np.allclose(np.concatenate(_sin)[48000:],
+                       np.sin(2 * _theta)[48000:], atol=4e-2)
+
+    with pytest.raises(ValueError):
+        PLL(streaming=True)
@@ -1,8 +1,12 @@
 """Ring Buffer test."""
 
+import time
+import threading
+
 import numpy as np
+import pytest
 
-from radiocore import RingBuffer
+from radiocore import FanoutRingBuffer, RingBuffer
 
 
 def test_buffer():
@@ -43,8 +47,201 @@ def test_buffer():
     assert np.allclose(a.data, [1., 1., 1., 1., 5., 6., 7., 8.])
     print(a, a.occupancy)
 
-    a.put([1, 1, 1, 1])
-    assert a.occupancy == 4
+    # Only the oldest elements that don't fit are dropped.
+    a.put([2, 2, 2, 2])
+    assert a.occupancy == 8
     assert a.capacity == 8
-    assert a.vacancy == 4
+    assert a.vacancy == 0
+    assert np.allclose(a.data, [1., 1., 1., 1., 2., 2., 2., 2.])
+    assert a.overflow == 1
+    assert a.dropped == 4
+    assert a.high_water == 8
     print(a, a.occupancy)
+
+
+def test_read_view():
+    """Test read views of the ring buffer."""
+    for _mirrored in (False, True):
+        a = RingBuffer(1024, dtype=np.float32, mirrored=_mirrored)
+        assert a.capacity == 1024
+        assert a.is_mirrored == _mirrored
+
+        a.put(np.arange(1000))
+        assert np.allclose(a.read_view(900), np.arange(900))
+        a.release(900)
+        assert a.occupancy == 100
+
+        # Elements wrapping around the end are contiguous.
+        a.put(np.arange(1000, 1800))
+        _view = a.read_view(900)
+        assert np.allclose(_view, np.arange(900, 1800))
+        assert np.shares_memory(_view, a.data) == _mirrored
+        a.release(900)
+        assert a.occupancy == 0
+
+    # Capacity is rounded up to whole memory pages.
+    a = RingBuffer(1000, dtype=np.complex64, mirrored=True)
+    assert a.capacity % 512 == 0
+    assert a.read_view(1, timeout=0.01) is None
+
+
+def test_reserve():
+    """Test writes in place into the ring buffer."""
+    for _mirrored in (False, True):
+        a = RingBuffer(1024, dtype=np.float32, mirrored=_mirrored)
+        a.put(np.zeros(1000))
+        a.release(1000)
+
+        # Space wrapping around the end is split unless mirrored.
+        _first, _second = a.reserve(100)
+        assert len(_first) == (100 if _mirrored else 24)
+        assert len(_second) == (0 if _mirrored else 76)
+        _first[:] = np.arange(len(_first))
+        _second[:] = np.arange(len(_first), 100)
+        assert a.occupancy == 0
+
+        # Only the committed elements are published.
+        a.commit(60)
+        assert a.occupancy == 60
+        assert np.allclose(a.read_view(60), np.arange(60))
+
+        with pytest.raises(ValueError):
+            a.commit(1)
+
+
+def test_threads():
+    """Test one producer and one consumer thread."""
+    a = RingBuffer(4096, dtype=np.float32, allow_overflow=False)
+    _input = np.arange(200000, dtype=np.float32)
+
+    def _produce():
+        for _part in np.split(_input, np.arange(1000, len(_input), 1000)):
+            while a.vacancy < len(_part):
+                time.sleep(1e-4)
+            a.put(_part)
+
+    _thread = threading.Thread(target=_produce)
+    _thread.start()
+
+    _output = []
+    while sum(len(_part) for _part in _output) < len(_input):
+        _part = a.get_available(1500)
+        assert _part is not None
+        _output.append(_part)
+    _thread.join()
+
+    assert np.array_equal(np.concatenate(_output), _input)
+
+
+def test_get_available():
+    """Test partial reads of the ring buffer."""
+    a = RingBuffer(8, dtype=np.float32)
+    assert a.get_available(4, timeout=0.01) is None
+
+    a.put([1, 2, 3])
+    _out = np.zeros(8, dtype=np.float32)
+    _part = a.get_available(8, out=_out)
+    assert np.allclose(_part, [1, 2, 3])
+    assert np.shares_memory(_part, _out)
+    assert a.occupancy == 0
+
+    a.put([4, 5, 6, 7, 8, 9])
+    assert np.allclose(a.get_available(4), [4, 5, 6, 7])
+    assert np.allclose(a.get_available(4), [8, 9])
+
+
+def test_overflow():
+    """Test overflow policies of the ring buffer."""
+    a = RingBuffer(8, dtype=np.float32, overflow="drop_newest")
+    a.put([1, 2, 3, 4, 5, 6])
+    a.put([7, 8, 9, 10])
+    assert a.overflow == 1
+    assert a.dropped == 2
+    assert np.allclose(a.get_available(8), [1, 2, 3, 4, 5, 6, 7, 8])
+
+    a = RingBuffer(8, dtype=np.float32, overflow="raise")
+    a.put([1, 2, 3, 4, 5, 6])
+    with pytest.raises(ValueError):
+        a.put([7, 8, 9, 10])
+    assert a.overflow == 1
+    assert a.occupancy == 6
+
+    # The producer waits for the consumer to make room.
+    a = RingBuffer(8, dtype=np.float32, overflow="block")
+    a.put([1, 2, 3, 4, 5, 6])
+    _timer = threading.Timer(0.05, a.release, (4,))
+    _timer.start()
+    a.put([7, 8, 9, 10])
+    _timer.join()
+    assert a.overflow == 0
+    assert np.allclose(a.get_available(8), [5, 6, 7, 8, 9, 10])
+
+    # After the timeout, the newest elements are dropped.
+    a.put([1, 2, 3, 4, 5, 6])
+    a.put([7, 8, 9, 10], timeout=0.01)
+    assert a.overflow == 1
+    assert a.dropped == 2
+    assert a.high_water == 8
+
+    # A shorter reserved space isn't a drop.
+    a.release(8)
+    a.put([1, 2, 3, 4, 5, 6])
+    _first, _second = a.reserve(4, timeout=0.01)
+    assert len(_first) + len(_second) == 2
+    assert a.overflow == 1
+    assert a.dropped == 2
+
+    with pytest.raises(ValueError):
+        RingBuffer(8, overflow="reset")
+
+    # Elements discarded under an open view aren't skipped twice.
+    a = RingBuffer(128, dtype=np.float32)
+    a.put(np.arange(100))
+    a.read_view(100)
+    a.put(np.arange(100, 150))
+    a.release(100)
+    assert a.dropped == 22
+    assert np.allclose(a.get_available(128), np.arange(100, 150))
+
+
+def test_fanout():
+    """Test readers of the fan-out ring buffer."""
+    a = FanoutRingBuffer(8, dtype=np.float32)
+    _fast, _slow = a.add_reader(), a.add_reader()
+    _monitor = a.add_reader(detachable=True)
+    assert len(a.readers) == 3
+
+    # Every reader gets every element from the same backbuffer.
+    a.put([1, 2, 3, 4, 5, 6])
+    _view = _fast.read_view(4)
+    assert np.allclose(_view, [1, 2, 3, 4])
+    assert np.shares_memory(_view, a.data)
+    _fast.release(4)
+    assert np.allclose(_slow.get_available(3), [1, 2, 3])
+    assert a.occupancy == 6
+    assert _fast.occupancy == 2
+
+    # The stalled detachable reader is detached instead of an overflow.
+    a.put([7, 8])
+    a.put([9])
+    assert _monitor.is_detached
+    assert len(a.readers) == 2
+    assert a.overflow == 0
+    with pytest.raises(ValueError):
+        _monitor.read_view(1)
+
+    # Overflow is measured against the slowest reader.
+    a.put([10, 11, 12])
+    assert a.overflow == 1
+    assert a.dropped == 1
+    assert np.allclose(_slow.get_available(8), [5, 6, 7, 8, 9, 10, 11, 12])
+    assert np.allclose(_fast.get_available(8), [5, 6, 7, 8, 9, 10, 11, 12])
+
+    # Readers start at the current write position.
+    _late = a.add_reader()
+    assert _late.occupancy == 0
+    a.remove_reader(_late)
+    assert _late.is_detached
+
+    with pytest.raises(ValueError):
+        a.read_view(1)
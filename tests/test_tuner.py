@@ -0,0 +1,266 @@
+"""Tuner test."""
+
+import json
+
+import numpy as np
+import pytest
+from scipy import fft, signal
+
+from radiocore import Tuner, PolyphaseTuner, StreamingTuner, XlatingTuner
+from radiocore import fft_workers, use_autotune, disable_autotune
+
+
+def _tone(tuner, frequency, amplitude=1.0):
+    _t = np.arange(int(tuner.input_bandwidth)) / tuner.input_bandwidth
+    _f = frequency - tuner.input_frequency
+    return (amplitude * np.exp(2j * np.pi * _f * _t)).astype(np.complex64)
+
+
+def _peak(output):
+    _spectrum = np.abs(np.fft.fft(output)) / len(output)
+    _bin = np.argmax(_spectrum)
+    return np.fft.fftfreq(len(output), 1 / len(output))[_bin], _spectrum[_bin]
+
+
+def _check_tuner(tuner):
+    tuner.add_channel(100.1e6, 50e3, None)
+    tuner.add_channel(100.37e6, 40e3, None)
+    tuner.add_channel(99.8e6, 50e3, None)
+    tuner.request_bandwidth(1e6)
+
+    _sig = _tone(tuner, 100.1e6 + 7e3) + _tone(tuner, 100.37e6 - 3e3, 0.5)
+
+    for _ in range(2):
+        tuner.load(_sig)
+
+        _out = tuner.run(0)
+        assert len(_out) == 50e3
+        _freq, _amp = _peak(_out)
+        assert _freq == 7e3
+        assert np.isclose(_amp, 1.0, atol=1e-2)
+
+        _out = tuner.run(1)
+        assert len(_out) == 40e3
+        _freq, _amp = _peak(_out)
+        assert _freq == -3e3
+        assert np.isclose(_amp, 0.5, atol=1e-2)
+
+        _out = tuner.run(2)
+        assert len(_out) == 50e3
+        _freq, _amp = _peak(_out)
+        assert _amp < 1e-2
+
+        for _a, _b in zip(tuner.run_all(), [tuner.run(i) for i in range(3)]):
+            assert np.allclose(_a, _b)
+
+        _a, _b = tuner.run_many([2, 0])
+        assert np.allclose(_a, tuner.run(2))
+        assert np.allclose(_b, tuner.run(0))
+
+        # Outputs are new arrays, unless an out buffer is given.
+        _a, _b = tuner.run(0), tuner.run(0)
+        assert not np.shares_memory(_a, _b)
+        _out = np.empty(50000, dtype=np.complex64)
+        assert tuner.run(0, out=_out) is _out
+        assert np.allclose(_out, _a)
+
+
+def test_tuner():
+    """Test tuner function."""
+    tuner = Tuner()
+    _check_tuner(tuner)
+
+    # Compare against the FFT-domain resample of the rolled spectrum.
+    _sig = np.random.randn(int(tuner.input_bandwidth)).astype(np.complex64)
+    _win = fft.fftshift(signal.get_window("hann", len(_sig)))
+    tuner.load(_sig)
+
+    for _ch in tuner.channels():
+        _roll = int(tuner.input_frequency - _ch.center_frequency)
+        _tmp = np.roll(fft.fft(_sig), _roll)
+        _tmp = signal.resample(_tmp, int(_ch.bandwidth), window=_win,
+                               domain="freq")
+        assert np.allclose(tuner.run(_ch.index), _tmp, atol=1e-5)
+
+
+def test_fft_workers_tuner():
+    """Test tuner function with multiple FFT workers."""
+    tuner = Tuner()
+
+    with fft_workers(2):
+        _check_tuner(tuner)
+
+    _sig = np.random.randn(int(tuner.input_bandwidth)).astype(np.complex64)
+    with fft_workers(2):
+        tuner.load(_sig)
+        _expected = [_out.copy() for _out in tuner.run_all()]
+
+    tuner.load(_sig)
+    for _out, _exp in zip(tuner.run_all(), _expected):
+        assert np.allclose(_out, _exp, atol=1e-5)
+
+
+def test_share_spectrum():
+    """Test loading the spectrum into a shared buffer."""
+    tuner = Tuner(zoom=False)
+    tuner.add_channel(100.1e6, 50e3, None)
+    tuner.add_channel(99.8e6, 50e3, None)
+    tuner.request_bandwidth(1e6)
+
+    _sig = np.random.randn(int(tuner.input_bandwidth)).astype(np.complex64)
+    tuner.load(_sig)
+    _expected = tuner.run(0).copy()
+
+    _buffer = np.empty_like(tuner.spectrum)
+    tuner.share_spectrum(_buffer)
+
+    # The four-step FFT is planned with more workers, same size.
+    for _workers in (1, 4):
+        with fft_workers(_workers):
+            tuner.load(_sig)
+        assert tuner.spectrum is _buffer
+        assert np.allclose(tuner.run(0), _expected, atol=1e-5)
+
+    tuner.share_spectrum(None)
+    tuner.load(_sig)
+    assert tuner.spectrum is not _buffer
+
+
+def test_warmup():
+    """Test warmup function."""
+    tuner = Tuner()
+    tuner.add_channel(100.1e6, 50e3, None)
+    tuner.request_bandwidth(1e6)
+    _sig = _tone(tuner, 100.1e6 + 7e3)
+
+    reference = Tuner()
+    reference.add_channel(100.1e6, 50e3, None)
+    reference.request_bandwidth(1e6)
+    reference.load(_sig)
+
+    tuner.warmup()
+    tuner.load(_sig)
+    assert np.allclose(tuner.run(0), reference.run(0), atol=1e-5)
+
+    # Streaming tuners keep their buffers but rewind their state.
+    for _make in (lambda: StreamingTuner(10e3), PolyphaseTuner):
+        tuner = _make()
+        tuner.add_channel(100.1e6, 50e3, None)
+        tuner.request_bandwidth(1e6)
+        _sig = _tone(tuner, 100.1e6 + 7e3)
+        _size = 10000 if isinstance(tuner, StreamingTuner) else len(_sig)
+
+        reference = _make()
+        reference.add_channel(100.1e6, 50e3, None)
+        reference.request_bandwidth(1e6)
+        reference.load(_sig[:_size])
+
+        tuner.warmup()
+        tuner.load(_sig[:_size])
+        assert np.allclose(tuner.run(0), reference.run(0), atol=1e-5)
+
+
+def test_autotune(tmp_path):
+    """Test autotune function."""
+    _cache = tmp_path / "autotune.json"
+    use_autotune(str(_cache), repeat=1)
+
+    try:
+        tuner = Tuner()
+        tuner.add_channel(100.1e6, 50e3, None)
+        tuner.request_bandwidth(1e6)
+        tuner.load(np.zeros(int(1e6), dtype=np.complex64))
+
+        _results = json.loads(_cache.read_text())
+        assert len(_results) == 1
+        for _value in _results.values():
+            assert tuner.is_zoomed == (_value == "zoom")
+
+        # Next constructions read the choices from the cache file.
+        _mode = "full" if tuner.is_zoomed else "zoom"
+        _cache.write_text(json.dumps({_key: _mode for _key in _results}))
+        use_autotune(str(_cache))
+        tuner = Tuner()
+        tuner.add_channel(100.1e6, 50e3, None)
+        tuner.request_bandwidth(1e6)
+        tuner.load(np.zeros(int(1e6), dtype=np.complex64))
+        assert tuner.is_zoomed == (_mode == "zoom")
+    finally:
+        disable_autotune()
+
+
+def test_zoom_tuner():
+    """Test zoom tuner function."""
+    tuner = Tuner(zoom=True)
+    _check_tuner(tuner)
+    assert tuner.is_zoomed
+
+    # Compare against the full FFT.
+    reference = Tuner(zoom=False)
+    _check_tuner(reference)
+    assert not reference.is_zoomed
+
+    _sig = np.random.randn(int(tuner.input_bandwidth)).astype(np.complex64)
+    tuner.load(_sig)
+    reference.load(_sig)
+
+    for _a, _b in zip(tuner.run_all(), reference.run_all()):
+        assert np.allclose(_a, _b, atol=1e-2 * np.max(np.abs(_b)))
+
+    # Automatic mode depends on the channel occupancy.
+    tuner = Tuner()
+    tuner.add_channel(100.1e6, 50e3, None)
+    tuner.add_channel(100.2e6, 50e3, None)
+    tuner.request_bandwidth(4e6)
+    tuner.load(np.zeros(int(4e6), dtype=np.complex64))
+    assert tuner.is_zoomed
+
+    tuner = Tuner()
+    for _i in range(20):
+        tuner.add_channel(100e6 + _i * 50e3, 50e3, None)
+    tuner.load(np.zeros(int(tuner.input_bandwidth), dtype=np.complex64))
+    assert not tuner.is_zoomed
+
+
+def test_polyphase_tuner():
+    """Test polyphase tuner function."""
+    tuner = PolyphaseTuner()
+    _check_tuner(tuner)
+    assert tuner.num_branches == 10
+
+
+def test_squelch_support():
+    """Test tuners without squelch measurement reject it."""
+    for tuner in (PolyphaseTuner(), StreamingTuner(10e3), XlatingTuner()):
+        with pytest.raises(ValueError):
+            tuner.add_channel(100.1e6, 50e3, None, squelch=-20.0)
+
+
+def test_streaming_tuner():
+    """Test streaming tuner function."""
+    tuner = StreamingTuner(10e3)
+    tuner.add_channel(100.1e6, 50e3, None)
+    tuner.add_channel(100.37e6, 40e3, None)
+    tuner.request_bandwidth(1e6)
+
+    assert tuner.output_size(0) == 500
+    assert tuner.output_size(1) == 400
+
+    _sig = _tone(tuner, 100.1e6 + 7013.3) + _tone(tuner, 100.37e6 - 3e3, 0.5)
+
+    _outputs = [[], []]
+    for _block in np.split(_sig, 100):
+        tuner.load(_block)
+        _a, _b = tuner.run_all()
+        assert np.allclose(_a, tuner.run(0))
+        assert np.allclose(_b, tuner.run(1))
+        _outputs[0].append(_a)
+        _outputs[1].append(_b)
+
+    # Skip the start-up transient. The tones should be continuous.
+    for _out, _freq, _amp, _bw in [(_outputs[0], 7013.3, 1.0, 50e3),
+                                   (_outputs[1], -3e3, 0.5, 40e3)]:
+        _out = np.concatenate(_out[4:])
+        _step = np.diff(np.unwrap(np.angle(_out)))
+        assert np.allclose(np.abs(_out), _amp, atol=1e-2)
+        assert np.allclose(_step, 2 * np.pi * _freq / _bw, atol=1e-3)
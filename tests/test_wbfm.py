@@ -0,0 +1,69 @@
+"""WBFM test."""
+
+import numpy as np
+
+from radiocore import WBFM
+
+
+def test_output_buffers():
+    """Test out buffers and stereo layouts."""
+    _sig = np.exp(1j * np.cumsum(np.random.randn(240000) * 0.3))
+    _sig = _sig.astype(np.complex64)
+
+    interleaved = WBFM(240e3, 48e3)
+    planar = WBFM(240e3, 48e3, layout="planar")
+    _out = np.empty((2, 48000), dtype=np.float32)
+
+    for _ in range(2):
+        _lr = interleaved.run(_sig)
+        assert _lr.shape == (1, 48000, 2)
+        assert planar.run(_sig, out=_out) is _out
+        assert np.allclose(_lr[0].T, _out)
+
+    # The streaming blocks write the last stage straight into out.
+    interleaved = WBFM(240e3, 48e3, streaming=True)
+    planar = WBFM(240e3, 48e3, streaming=True, layout="planar")
+
+    for _ in range(2):
+        assert planar.run(_sig, out=_out) is _out
+        assert np.allclose(interleaved.run(_sig)[0].T, _out)
+
+    # Cascades of two stages output into the same buffers.
+    _sig = np.resize(_sig, 250000)
+    demod = WBFM(250e3, 48e3, streaming=True, layout="planar")
+
+    for _ in range(2):
+        assert demod.run(_sig, out=_out) is _out
+        assert demod.run(_sig).shape == (2, 48000)
+
+
+def test_pilot_gate():
+    """Test stereo decoding only with a pilot."""
+    _t = np.arange(240000) / 240e3
+    _audio = 0.5 * np.sin(2 * np.pi * 1e3 * _t)
+    _pilot = 0.1 * np.cos(2 * np.pi * (19e3 + 2) * _t)
+
+    for _composite, _stereo in ((_audio + _pilot, True), (_audio, False)):
+        _sig = np.exp(2j * np.pi * 75e3 * np.cumsum(_composite) / 240e3)
+        demod = WBFM(240e3, 48e3, streaming=True, pilot_threshold=-22.0)
+        _lr = demod.run(_sig.astype(np.complex64))
+        assert demod.stereo == _stereo
+        assert _lr.shape == (1, 48000, 2)
+        assert np.array_equal(_lr[0, :, 0], _lr[0, :, 1]) != _stereo
+
+    # Without threshold, stereo is always decoded.
+    demod = WBFM(240e3, 48e3)
+    demod.run(_sig.astype(np.complex64))
+    assert demod.stereo
+
+
+def test_warmup():
+    """Test warmup function."""
+    _sig = np.random.randn(240000).astype(np.complex64)
+    _expected = WBFM(240e3, 48e3, streaming=True).run(_sig)
+
+    # Streaming blocks keep their buffers but rewind their state.
+    demod = WBFM(240e3, 48e3, streaming=True)
+    demod.warmup()
+    assert "_workspace" in vars(demod)
+    assert np.allclose(demod.run(_sig), _expected, atol=1e-5)
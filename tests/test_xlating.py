@@ -0,0 +1,59 @@
+"""Xlating Tuner test."""
+
+import numpy as np
+import pytest
+
+from radiocore import XlatingTuner
+
+
+def test_xlating_tuner():
+    """Test xlating tuner function."""
+    tuner = XlatingTuner()
+    tuner.add_channel(100.1e6, 50e3, None)
+    tuner.add_channel(100.37e6, 40e3, None)
+    tuner.add_channel(99.8e6, 50e3, None)
+    tuner.request_bandwidth(1e6)
+
+    _t = np.arange(int(1e6)) / 1e6
+    _f = tuner.input_frequency
+    _sig = np.exp(2j * np.pi * (100.1e6 + 7013.3 - _f) * _t)
+    _sig += 0.5 * np.exp(2j * np.pi * (100.37e6 - 3e3 - _f) * _t)
+    _sig = _sig.astype(np.complex64)
+
+    _outputs = [[], [], []]
+    for _block in np.split(_sig, 20):
+        tuner.load(_block)
+        for _out, _ch in zip(_outputs, tuner.run_all()):
+            _out.append(_ch)
+        assert tuner.run(0) is _outputs[0][-1]
+
+    assert len(np.concatenate(_outputs[0])) == 50e3
+    assert len(np.concatenate(_outputs[1])) == 40e3
+
+    # Skip the start-up transient. The tones should be continuous.
+    for _out, _freq, _amp, _bw in [(_outputs[0], 7013.3, 1.0, 50e3),
+                                   (_outputs[1], -3e3, 0.5, 40e3)]:
+        _out = np.concatenate(_out[2:])
+        _step = np.diff(np.unwrap(np.angle(_out)))
+        assert np.allclose(np.abs(_out), _amp, atol=1e-2)
+        assert np.allclose(_step, 2 * np.pi * _freq / _bw, atol=1e-2)
+
+    assert np.max(np.abs(np.concatenate(_outputs[2][2:]))) < 1e-2
+
+
+def test_xlating_warmup():
+    """Test xlating tuner warmup function."""
+    tuner, reference = XlatingTuner(), XlatingTuner()
+    for _tuner in (tuner, reference):
+        _tuner.add_channel(100.1e6, 50e3, None)
+        _tuner.request_bandwidth(1e6)
+
+    with pytest.raises(ValueError):
+        tuner.warmup()
+
+    # The warmup plans for the block size without changing the output.
+    _sig = np.random.randn(50000).astype(np.complex64)
+    tuner.warmup(len(_sig))
+    for _tuner in (tuner, reference):
+        _tuner.load(_sig)
+    assert np.allclose(tuner.run(0), reference.run(0))